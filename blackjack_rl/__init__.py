@@ -0,0 +1,40 @@
+"""
+Tabular reinforcement learning for blackjack.
+
+The public API is re-exported here: environments (env), agents and training (agents), policy evaluation
+(evaluation), exact solvers (solvers), plotting (visualization) and policy serving (serving).
+Each name is imported from its subpackage when it is first accessed, so importing the package (or only
+blackjack_rl.serving) does not load the training code, matplotlib, seaborn or Numba.
+"""
+import importlib
+
+# public name -> module it is defined in
+_EXPORTS = {
+    **dict.fromkeys(['ACTION_NAMES', 'DOUBLE', 'HIT', 'INSURANCE', 'SPLIT', 'STAND', 'SURRENDER',
+                     'BatchBlackjackEnviron', 'BlackjackEnviron', 'TableRules'], 'env'),
+    **dict.fromkeys(['LEARNERS', 'ConvergenceTracker', 'CountQTable', 'ExpectedSarsaLearner', 'Learner',
+                     'MonteCarloLearner', 'QLearner', 'QTable', 'RandomLearner', 'aggregate_runs', 'basic_strategy_action',
+                     'basic_strategy_policy', 'check_accuracy', 'policy_agreement', 'q_to_grid_stack', 'q_to_grids',
+                     'random_agent', 'run_episodes', 'sweep', 'sweep_configs', 'sweep_trial', 'train', 'train_batched',
+                     'train_learner', 'train_many', 'train_run'], 'agents'),
+    **dict.fromkeys(['CountSpread', 'FlatBet', 'KellyBet', 'compare_policies', 'evaluate_hands', 'evaluate_policy',
+                     'simulate_bankrolls'], 'evaluation'),
+    'solve': 'solvers',
+    **dict.fromkeys(['load_checkpoint', 'load_q_table', 'save_checkpoint', 'save_q_table'], 'checkpoint'),
+    'TrainResult': 'train_log',
+    **dict.fromkeys(['CompiledPolicy', 'PolicyServer', 'compile_policy', 'serve'], 'serving'),
+    **dict.fromkeys(['eval_accuracy', 'eval_replenish', 'plot_basic_strategy', 'plot_evolution', 'plot_heatmap',
+                     'plot_policy_and_agreement'], 'visualization'),
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+        globals()[name] = value # later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,10 @@
+"""
+Tabular agents: Q-tables, the learners and the training, sweep and agreement functions.
+"""
+from .q_table import CountQTable, QTable
+from .learners import (LEARNERS, ExpectedSarsaLearner, Learner, MonteCarloLearner, QLearner, RandomLearner,
+                       epsilon_schedule, run_episodes)
+from .q_agent import (aggregate_runs, basic_strategy_action, basic_strategy_policy, check_accuracy, policy_agreement,
+                      q_to_grid_stack, q_to_grids, random_agent, sweep, sweep_configs, sweep_trial, train, train_batched,
+                      train_learner, train_many, train_run)
+from .convergence import ConvergenceTracker, DeltaSnapshots
@@ -0,0 +1,156 @@
+from collections.abc import Sequence
+import numpy as np
+from ..evaluation import evaluator
+
+class DeltaSnapshots(Sequence):
+    def __init__(self, tracker):
+        """
+        Read-only list of checkpoint Q-tables rebuilt from a ConvergenceTracker's delta log, which can be
+        used wherever train() returns checkpoint_Qs (e.g. plot_evolution). Each snapshot has the exact greedy
+        policy and seen states of its checkpoint, Q-values within the tracker's tolerance and no visit counts.
+        """
+        self._tracker = tracker
+
+    def __len__(self):
+        return len(self._tracker.deltas)
+
+    def _apply(self, Q, delta):
+        idx, values, seen = delta
+        Q.values.reshape(-1, len(Q.actions))[idx] = values
+        Q.seen.reshape(-1)[idx] = seen
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        Q = self._tracker.base.snapshot()
+        for delta in self._tracker.deltas[:index + 1]:
+            self._apply(Q, delta)
+        return Q
+
+    def __iter__(self):
+        # applies the deltas one after another instead of rebuilding every snapshot from the start
+        if not len(self):
+            return
+        Q = self._tracker.base.snapshot()
+        for delta in self._tracker.deltas:
+            self._apply(Q, delta)
+            yield Q.snapshot()
+
+class ConvergenceTracker:
+    def __init__(self, tolerance=1e-3, window=4, max_flips=2, max_delta=None, reference=None, min_episodes=0):
+        """
+        Tracks convergence at the checkpoints of train() and train_learner() instead of keeping a full copy
+        of the Q-table at each one. At every checkpoint it records only the cells (states) whose greedy action
+        or seen flag changed, or whose Q-values moved by more than `tolerance`, since they were last recorded.
+        It also computes the convergence metrics online, and reports the run as converged once the policy has
+        been stable for `window` checkpoints in a row, so training can stop early. Training stores its
+        checkpoints with a tracker with window=None unless it is given one (or full_snapshots=True).
+
+        Args:
+            tolerance: smallest change of a Q-value that gets recorded (0 records every change, so the
+                snapshots are exact). The greedy action of every snapshot is exact either way.
+            window: number of consecutive stable checkpoints after which training stops (None never stops).
+            max_flips: most policy flips (states whose greedy action changed) a stable checkpoint can have.
+                A few states are close ties between hitting and standing and keep flipping with a constant alpha.
+            max_delta: optional limit on the largest |ΔQ| of a stable checkpoint (not checked if None).
+            reference: optional policy to measure agreement with: a QTable or policy array per (player total,
+                dealer upcard, usable ace), e.g. solver.solve().policy or basic_strategy_policy().
+            min_episodes: number of episodes before which a run is never reported as converged.
+        """
+        self.tolerance = tolerance
+        self.window = window
+        self.max_flips = max_flips
+        self.max_delta = max_delta
+        self.reference = None if reference is None else np.asarray(evaluator.as_policy(reference))
+        self.min_episodes = min_episodes
+        self.history = [] # metrics of each checkpoint
+        self.deltas = [] # (cell indices, their Q-values, their seen flags) of each checkpoint
+        self.episodes = []
+        self.base = None # empty Q-table the deltas apply to
+        self.stable = 0 # number of stable checkpoints in a row
+        self._previous = None # Q-values and seen flags at the last checkpoint
+        self._recorded = None # Q-values and seen flags as of the delta log
+
+    @property
+    def snapshots(self):
+        """
+        Returns: the checkpoint Q-tables as a DeltaSnapshots sequence.
+        """
+        return DeltaSnapshots(self)
+
+    @property
+    def converged(self):
+        """
+        Returns: whether the last `window` checkpoints were all stable.
+        """
+        return (self.window is not None and self.stable >= self.window and bool(self.episodes)
+                and self.episodes[-1] >= self.min_episodes)
+
+    @property
+    def nbytes(self):
+        """
+        Returns: memory used by the delta log in bytes.
+        """
+        return sum(idx.nbytes + values.nbytes + seen.nbytes for idx, values, seen in self.deltas)
+
+    def record(self, episode, Q):
+        """
+        Records a checkpoint: appends the changed cells to the delta log and computes its metrics.
+
+        Args:
+            episode: number of episodes finished.
+            Q: QTable (or CountQTable) being trained.
+        Returns: dictionary of the checkpoint's metrics: 'episode', 'recorded' (cells in its delta), 'new_states',
+            'flips' (seen states whose greedy action changed), 'max_delta' (largest |ΔQ| of a seen state),
+            'agreement' (with the reference policy, if any) and 'stable'.
+        """
+        values = Q.values.reshape(-1, len(Q.actions))
+        seen = Q.seen.reshape(-1)
+        if self.base is None:
+            self.base = Q.snapshot()
+            self.base.values[:] = Q.initial_value
+            self.base.visits[:] = 0
+            self.base.seen[:] = False
+            empty = self.base.values.reshape(-1, len(Q.actions))
+            self._recorded = (empty.copy(), np.zeros_like(seen))
+            self._previous = (empty.copy(), np.zeros_like(seen))
+        previous_values, previous_seen = self._previous
+        recorded_values, recorded_seen = self._recorded
+        greedy = values.argmax(axis=1)
+
+        changed = ((seen != recorded_seen) | (greedy != recorded_values.argmax(axis=1))
+                   | (np.abs(values - recorded_values).max(axis=1) > self.tolerance))
+        idx = np.flatnonzero(changed).astype(np.int32)
+        self.deltas.append((idx, values[idx].copy(), seen[idx].copy()))
+        recorded_values[idx] = values[idx]
+        recorded_seen[idx] = seen[idx]
+
+        both = seen & previous_seen
+        flips = int((greedy[both] != previous_values[both].argmax(axis=1)).sum())
+        max_delta = float(np.abs(values[seen] - previous_values[seen]).max()) if seen.any() else 0.0
+        metrics = {'episode': episode, 'recorded': len(idx), 'new_states': int((seen & ~previous_seen).sum()),
+                   'flips': flips, 'max_delta': max_delta}
+        if self.reference is not None:
+            policy = np.asarray(evaluator.as_policy(Q))
+            compared = (self.reference >= 0) & (policy >= 0)
+            metrics['agreement'] = float((policy[compared] == self.reference[compared]).mean()) if compared.any() else 0.0
+        # the first checkpoint has nothing to compare against, so it is never stable
+        stable = bool(self.episodes) and flips <= self.max_flips and (self.max_delta is None or max_delta <= self.max_delta)
+        self.stable = self.stable + 1 if stable else 0
+        metrics['stable'] = stable
+        previous_values[:] = values
+        previous_seen[:] = seen
+        self.episodes.append(episode)
+        self.history.append(metrics)
+        return metrics
+
+    def replay(self, checkpoint_Qs, checkpoint_episodes):
+        """
+        Records earlier checkpoints in order, e.g. the snapshots of a checkpoint file training resumes from.
+        """
+        for episode, Q in zip(checkpoint_episodes, checkpoint_Qs):
+            self.record(episode, Q)
@@ -0,0 +1,328 @@
+import numpy as np
+from ..env import blackjack_environ
+from . import q_table
+
+def epsilon_schedule(finished, episodes, epsilon=1.0, epsilon_mid=0.1, epsilon_min=0.01, decay_split=0.1):
+    """
+    Exploration rate of the two-phase schedule of train() after a number of finished episodes, in closed form
+    (train() multiplies epsilon by the first phase's rate after each of the first decay_split*episodes+1 episodes
+    and by the second phase's rate after the rest).
+
+    Args:
+        finished: number of episodes finished (an integer or an array).
+        episodes, epsilon, epsilon_mid, epsilon_min, decay_split: schedule arguments, as in train().
+    Returns: exploration rate(s).
+    """
+    rate_first = np.exp(np.log(epsilon_mid/epsilon)/(decay_split*episodes))
+    rate_rest = np.exp(np.log(epsilon_min/epsilon_mid)/((1-decay_split)*episodes))
+    first = np.floor(decay_split*episodes) + 1 # episodes followed by the first phase's rate
+    return np.maximum(epsilon_min, epsilon * rate_first**np.minimum(finished, first) * rate_rest**np.maximum(0, finished - first))
+
+def state_index(states):
+    """
+    Returns: flat indices of an (N, 3) integer array of (player total, dealer upcard, usable ace) states,
+        into the rows of a QTable's values (raveled over the state axes).
+    """
+    return (states[:, 0] * q_table.NUM_UPCARDS + states[:, 1]) * 2 + states[:, 2]
+
+def scatter_update(values, pair_idx, targets, alpha, collisions='compound'):
+    """
+    Moves a batch of flat Q-values towards their targets in place. Updates that collide on the same
+    state-action pair are combined according to `collisions`:
+        'compound': the targets are averaged and the pair moves towards the mean by 1 - (1 - alpha)**k for k
+            colliding updates, the same as k sequential updates towards that mean.
+        'mean': the pair moves towards the mean target by alpha once, whatever the number of updates.
+        'sum': every update adds alpha * (target - Q) with np.add.at, which matches sequential updates only
+            while alpha * k stays well below 1 (small batches); it diverges otherwise.
+
+    Args:
+        values: flat array of Q-values (a view of QTable.values).
+        pair_idx: integer array of flat (state, action) indices.
+        targets: array of targets, one per index.
+        alpha: learning rate.
+        collisions: 'compound', 'mean' or 'sum'.
+    """
+    if pair_idx.size == 1: # a single update (scalar environment) cannot collide
+        values[pair_idx] += alpha * (targets - values[pair_idx])
+    elif collisions == 'sum':
+        np.add.at(values, pair_idx, alpha * (targets - values[pair_idx]))
+    else:
+        counts = np.bincount(pair_idx, minlength=values.size)
+        sums = np.bincount(pair_idx, weights=targets, minlength=values.size)
+        touched = np.flatnonzero(counts)
+        k = counts[touched]
+        step = 1 - (1 - alpha)**k if collisions == 'compound' else alpha
+        values[touched] += step * (sums[touched] / k - values[touched])
+
+class Learner:
+    def __init__(self, actions, alpha=0.1, gamma=0.9, initial_value=1.0):
+        """
+        Tabular learner over the (player total, dealer upcard, usable ace) states, driven by run_episodes.
+        Every method works on a batch of tables at once (a single table for the scalar environment), with states
+        given as flat indices (see state_index): select_action picks actions, observe sees the transitions they
+        led to, and end_episode is told which tables finished their round. Subclasses implement the update rule.
+
+        Args:
+            actions: list of action names, in the same order as the environment's actions.
+            alpha: learning rate.
+            gamma: discount factor.
+            initial_value: initial Q-value of every state-action pair (optimistic by default).
+        """
+        self.Q = q_table.QTable(actions, initial_value)
+        self.alpha = alpha
+        self.gamma = gamma
+        self.num_actions = len(self.Q.actions)
+        self.epsilon = 0.0
+        self.values = self.Q.values.reshape(-1) # flat view, indexed by the raveled (total, upcard, usable ace, action)
+        self.rows = self.Q.values.reshape(-1, self.num_actions) # view of the Q-value rows, indexed by the raveled state
+
+    def select_action(self, state_idx, epsilon, u):
+        """
+        Epsilon-greedy action selection with one uniform draw per table; a draw below epsilon also picks the
+        random action (ties between Q-values go to the first action).
+
+        Args:
+            state_idx: flat state indices (see state_index).
+            epsilon: exploration rate.
+            u: uniform draws in [0, 1), one per table.
+        Returns: integer array of action indices.
+        """
+        self.epsilon = epsilon
+        greedy = self.rows[state_idx].argmax(axis=1)
+        if epsilon <= 0:
+            return greedy
+        explore = np.minimum((u / epsilon * self.num_actions).astype(np.int64), self.num_actions - 1)
+        return np.where(u < epsilon, explore, greedy)
+
+    def observe(self, state_idx, actions, rewards, next_idx, dones):
+        """
+        Records the transitions of one step: marks the states as seen and visited (next states only where the
+        round goes on, since finished tables already show their next round's state). Subclasses then update.
+
+        Args:
+            state_idx: flat indices of the states the actions were taken in.
+            actions: action indices taken.
+            rewards: rewards received.
+            next_idx: flat indices of the states after the step.
+            dones: boolean mask of tables whose round ended.
+        """
+        seen = self.Q.seen.reshape(-1)
+        seen[state_idx] = True
+        seen[next_idx[~dones]] = True
+        if state_idx.size == 1:
+            self.Q.visits.reshape(-1)[state_idx] += 1
+        else:
+            self.Q.visits += np.bincount(state_idx, minlength=self.Q.visits.size).reshape(self.Q.visits.shape)
+
+    def end_episode(self, dones):
+        """
+        Called after observe with the mask of tables whose round ended.
+        """
+
+class QLearner(Learner):
+    def __init__(self, actions, alpha=0.1, gamma=0.9, initial_value=1.0, collisions='compound'):
+        """
+        Tabular Q-learning: each transition moves Q(s, a) towards r + gamma * max_a' Q(s', a').
+        All updates of a step bootstrap from the Q-values before it; colliding updates are
+        combined according to `collisions` (see scatter_update).
+        """
+        super().__init__(actions, alpha, gamma, initial_value)
+        if collisions not in ('compound', 'mean', 'sum'):
+            raise ValueError(f"Unknown collision mode: {collisions}")
+        self.collisions = collisions
+
+    def next_value(self, next_idx):
+        return self.rows[next_idx].max(axis=1)
+
+    def observe(self, state_idx, actions, rewards, next_idx, dones):
+        super().observe(state_idx, actions, rewards, next_idx, dones)
+        targets = np.where(dones, rewards, rewards + self.gamma * self.next_value(next_idx))
+        scatter_update(self.values, state_idx * self.num_actions + actions, targets, self.alpha, self.collisions)
+
+class ExpectedSarsaLearner(QLearner):
+    def __init__(self, actions, alpha=0.1, gamma=0.9, initial_value=1.0, collisions='compound'):
+        """
+        Expected SARSA: like Q-learning, but bootstraps from the expected Q-value of the next state under
+        the current epsilon-greedy policy, (1 - epsilon) * max_a' Q(s', a') + epsilon * mean_a' Q(s', a').
+        """
+        super().__init__(actions, alpha, gamma, initial_value, collisions)
+
+    def next_value(self, next_idx):
+        rows = self.rows[next_idx]
+        return (1 - self.epsilon) * rows.max(axis=1) + self.epsilon * rows.mean(axis=1)
+
+class MonteCarloLearner(Learner):
+    def __init__(self, actions, alpha=None, gamma=0.9, initial_value=1.0):
+        """
+        Every-visit Monte Carlo control: the state-action pairs of each table's round are kept until the round
+        ends, then every pair moves towards the discounted return that followed it. With alpha=None, Q(s, a)
+        is the sample average of all its returns (the first return replaces the initial value); otherwise it
+        moves by alpha towards each return, colliding returns compounded as in scatter_update.
+        """
+        super().__init__(actions, alpha, gamma, initial_value)
+        self.counts = np.zeros(self.values.size, dtype=np.int64) # returns averaged into each pair
+        self._pairs = None # (N, capacity) state-action indices of each table's round so far
+        self._rewards = None
+        self._length = None
+
+    def observe(self, state_idx, actions, rewards, next_idx, dones):
+        super().observe(state_idx, actions, rewards, next_idx, dones)
+        n = len(state_idx)
+        if self._pairs is None or len(self._pairs) != n:
+            self._pairs = np.zeros((n, 16), dtype=np.int64)
+            self._rewards = np.zeros((n, 16))
+            self._length = np.zeros(n, dtype=np.int64)
+        if self._length.max() == self._pairs.shape[1]:
+            self._pairs = np.concatenate([self._pairs, np.zeros_like(self._pairs)], axis=1)
+            self._rewards = np.concatenate([self._rewards, np.zeros_like(self._rewards)], axis=1)
+        tables = np.arange(n)
+        self._pairs[tables, self._length] = state_idx * self.num_actions + actions
+        self._rewards[tables, self._length] = rewards
+        self._length += 1
+
+    def end_episode(self, dones):
+        idx = np.flatnonzero(dones)
+        if not idx.size:
+            return
+        lengths = self._length[idx]
+        steps = int(lengths.max())
+        returns = np.zeros((idx.size, steps))
+        G = np.zeros(idx.size)
+        for t in range(steps - 1, -1, -1):
+            valid = t < lengths
+            G = np.where(valid, self._rewards[idx, t] + self.gamma * G, 0.0)
+            returns[:, t] = G
+        valid = np.arange(steps) < lengths[:, None]
+        pair_idx = self._pairs[idx, :steps][valid]
+        returns = returns[valid]
+        self._length[idx] = 0
+        if self.alpha is not None:
+            scatter_update(self.values, pair_idx, returns, self.alpha)
+            return
+        k = np.bincount(pair_idx, minlength=self.values.size)
+        sums = np.bincount(pair_idx, weights=returns, minlength=self.values.size)
+        touched = np.flatnonzero(k)
+        seen_before = self.counts[touched]
+        total = seen_before + k[touched]
+        self.values[touched] = np.where(seen_before > 0, (self.values[touched] * seen_before + sums[touched]) / total,
+                                        sums[touched] / k[touched])
+        self.counts[touched] = total
+
+class RandomLearner(Learner):
+    def __init__(self, actions):
+        """
+        Baseline that picks uniformly random actions and learns nothing (its Q-table stays untouched).
+        """
+        super().__init__(actions)
+
+    def select_action(self, state_idx, epsilon, u):
+        return np.minimum((u * self.num_actions).astype(np.int64), self.num_actions - 1)
+
+    def observe(self, state_idx, actions, rewards, next_idx, dones):
+        pass
+
+LEARNERS = {
+    'q_learning': QLearner,
+    'expected_sarsa': ExpectedSarsaLearner,
+    'monte_carlo': MonteCarloLearner,
+    'random': RandomLearner,
+}
+
+# number of action draws generated at once for the scalar environment
+DRAW_BLOCK = 4096
+
+def run_episodes(learner, environment, episodes, rng, epsilon=1.0, epsilon_mid=0.1, epsilon_min=0.01, decay_split=0.1,
+                 checkpoint=None, checkpoint_every=2500, replenish_below=10, replenish_amount=100):
+    """
+    Plays episodes with a learner against a BlackjackEnviron (one hand at a time, bet 1, with the bankroll
+    replenished like in train()) or a BatchBlackjackEnviron (every table at once, stopping at the first step
+    where at least `episodes` rounds have finished). Epsilon follows the two-phase schedule of train() over
+    the episodes finished so far (see epsilon_schedule). With the scalar environment, the uniform draws come
+    in blocks and epsilon decays after every episode exactly like in train(), so QLearner repeats train()'s
+    run for the same streams.
+
+    Args:
+        learner: Learner to train (or RandomLearner to just play).
+        environment: BlackjackEnviron or BatchBlackjackEnviron (hit/stand rules and the plain state).
+        episodes: number of episodes to play.
+        rng: numpy Generator for the learner's action draws.
+        epsilon, epsilon_mid, epsilon_min, decay_split: exploration schedule, as in train().
+        checkpoint: optional function called every checkpoint_every episodes as checkpoint(episode, Q);
+            training stops early if it returns True.
+        checkpoint_every: number of episodes between checkpoint calls.
+        replenish_below: bankroll at or below which the scalar environment's bankroll is replenished.
+        replenish_amount: amount added to the bankroll when it is replenished.
+    Returns:
+        diffs: list of episode counts between bankroll replenishments (scalar environment only).
+        win_amt: number of winning rounds.
+        total_return: total reward over the episodes.
+        finished: number of episodes played.
+    """
+    diffs = []
+    prev = 0
+    win_amt = 0
+    total_return = 0
+    finished = 0
+    next_check = checkpoint_every
+    batched = isinstance(environment, blackjack_environ.BatchBlackjackEnviron)
+    if batched:
+        state_idx = state_index(environment._get_states())
+    else:
+        rate_first = np.exp(np.log(epsilon_mid/epsilon)/(decay_split*episodes))
+        rate_rest = np.exp(np.log(epsilon_min/epsilon_mid)/((1-decay_split)*episodes))
+        eps = epsilon
+        draws = rng.random(DRAW_BLOCK)
+        draw = 0
+        done_mask = np.ones(1, dtype=bool)
+        not_done = np.zeros(1, dtype=bool)
+
+    while finished < episodes:
+        if batched:
+            eps = epsilon_schedule(finished, episodes, epsilon, epsilon_mid, epsilon_min, decay_split)
+            actions = learner.select_action(state_idx, eps, rng.random(len(state_idx)))
+            next_states, rewards, dones = environment.step(actions)
+            next_idx = state_index(next_states)
+            learner.observe(state_idx, actions, rewards, next_idx, dones)
+            learner.end_episode(dones)
+            state_idx = next_idx
+            done_rewards = rewards[dones]
+            win_amt += int((done_rewards > 0).sum())
+            total_return += float(done_rewards.sum())
+            finished += done_rewards.size
+        else:
+            environment.place_bet(1)
+            player, upcard, usable = environment.start_game()
+            state_idx = np.array([(player * q_table.NUM_UPCARDS + upcard) * 2 + usable])
+            done = False
+            total_reward = 0
+            while not done:
+                if draw == DRAW_BLOCK:
+                    draws = rng.random(DRAW_BLOCK)
+                    draw = 0
+                actions = learner.select_action(state_idx, eps, draws[draw:draw+1])
+                draw += 1
+                (player, upcard, usable), reward, done = environment.step(int(actions[0]))
+                next_idx = np.array([(player * q_table.NUM_UPCARDS + upcard) * 2 + usable])
+                learner.observe(state_idx, actions, np.array([reward], dtype=float), next_idx,
+                                done_mask if done else not_done)
+                state_idx = next_idx
+                total_reward += reward
+            learner.end_episode(done_mask)
+            win_amt += 1 if total_reward > 0 else 0
+            total_return += total_reward
+            eps = max(epsilon_min, eps * (rate_first if finished <= decay_split*episodes else rate_rest))
+            if environment.bankroll <= replenish_below:
+                environment.bankroll += replenish_amount
+                diffs.append(finished - prev)
+                prev = finished
+            finished += 1
+
+        stop = False
+        while checkpoint is not None and finished >= next_check and next_check <= episodes:
+            if checkpoint(next_check, learner.Q):
+                stop = True
+                break
+            next_check += checkpoint_every
+        if stop:
+            break
+    return diffs, win_amt, total_return, finished
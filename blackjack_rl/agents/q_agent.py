@@ -0,0 +1,904 @@
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from ..env import blackjack_environ
+from . import q_table
+from . import learners
+from . import convergence
+from ..evaluation import evaluator
+from ..evaluation import policy_kernel
+from .. import checkpoint
+from .. import train_log
+
+# number of exploration draws generated at once during training
+DRAW_BLOCK = 4096
+
+def train(alpha=0.1, gamma=0.9, epsilon=1.0, episodes=50000, bankroll=100,
+          epsilon_mid=0.1, epsilon_min=0.01, decay_split=0.1, stop_check=None,
+          resume_from=None, autosave_path=None, autosave_every=10000, count_buckets=None, remaining_buckets=None,
+          seed=None, instrument=None, log_dir=None, log_every=1000, tracker=None, full_snapshots=False):
+    """
+    Trains a Q-learning agent to play Blackjack.
+    
+    Args:
+        alpha: Learning rate for Q-learning updates.
+        gamma: Discount factor for future rewards.
+        epsilon: Initial exploration rate for epsilon-greedy action selection.
+        episodes: Number of training episodes.
+        bankroll: Initial amount of money/chips to work with.
+        epsilon_mid: Exploration rate reached at the end of the first decay phase.
+        epsilon_min: Exploration rate reached at the end of training (and its floor).
+        decay_split: Fraction of episodes spent in the first decay phase.
+        stop_check: Optional function called at every checkpoint as stop_check(episode, accuracies);
+            training stops early if it returns True.
+        resume_from: Optional checkpoint file (see checkpoint.py) to continue training from.
+            The other arguments should match the run that saved it.
+        autosave_path: Optional checkpoint file to save the training state to periodically and at the end.
+        autosave_every: Number of episodes between autosaves.
+        count_buckets: Optional true count limit to learn with the card-counting state (see BlackjackEnviron),
+            using a CountQTable. Accuracy checks then use the count-averaged policy.
+        remaining_buckets: Optional number of shoe remaining buckets to add to the card-counting state.
+        seed: Seed (or numpy Generator) for the run. Independent streams are spawned from it for the shoe,
+            the exploration draws and the accuracy checks, so the same seed always gives the same run.
+        instrument: Optional instrumentation.Instrumentation to time the training phases, count states and
+            replenishments, sample throughput and profile a window of episodes. Nothing is timed without it.
+        log_dir: Optional directory to stream the run to (see train_log.TrainLog) instead of keeping the
+            replenishment gaps and checkpoint snapshots in memory. train() then returns a train_log.TrainResult,
+            which reads them back lazily and unpacks like the tuple below.
+        log_every: Number of episodes aggregated into each logged record.
+        tracker: Optional convergence.ConvergenceTracker to store the checkpoints with, which also stops training
+            once the policy has been stable for its window. Without one, the checkpoints are stored by a tracker
+            that never stops. With log_dir, its metrics are also logged.
+        full_snapshots: Keep a full copy of the Q-table (with visit counts) at each checkpoint instead of the
+            tracker's delta log.
+    Returns:
+        Q: Learned QTable mapping states to action values.
+        state_visits: Dictionary tracking number of visits to each state.
+        diffs: List of episode counts between bankroll replenishments.
+        win_amt: Total number of winning rounds.
+        total_return: Total reward accumulated over training.
+        accuracies: List of accuracy measurements over time.
+        checkpoint_Qs: QTable snapshots at the checkpoints, rebuilt from the tracker's delta log when read
+            (convergence.DeltaSnapshots), or a list of full copies with full_snapshots.
+        checkpoint_episodes: List of episode numbers corresponding to checkpoints.
+    """
+    env_rng, agent_rng, eval_rng = np.random.default_rng(seed).spawn(3)
+    if tracker is None and not full_snapshots and not log_dir:
+        tracker = convergence.ConvergenceTracker(window=None) # checkpoints as a delta log, without stopping
+    environment = blackjack_environ.BlackjackEnviron(start_bankroll=bankroll, count_buckets=count_buckets,
+                                                     remaining_buckets=remaining_buckets, seed=env_rng)
+    # create Q-table (optimistic initial values)
+    if count_buckets is None:
+        Q = q_table.QTable(environment.actions, initial_value=1.0)
+    else:
+        Q = q_table.CountQTable(environment.actions, 1.0, count_buckets, remaining_buckets)
+    num_actions = len(environment.actions)
+    diffs = []
+    prev = 0
+    win_amt = 0
+    total_return = 0
+    accuracies = []
+    checkpoint_Qs = []
+    checkpoint_episodes = []
+    # per-episode epsilon decay rates for the two phases
+    rate_first = np.exp(np.log(epsilon_mid/epsilon)/(decay_split*episodes)) # epsilon to epsilon_mid in first phase
+    rate_rest = np.exp(np.log(epsilon_min/epsilon_mid)/((1-decay_split)*episodes)) # epsilon_mid to epsilon_min in the rest
+    config = {'alpha': alpha, 'gamma': gamma, 'epsilon': epsilon, 'episodes': episodes, 'bankroll': bankroll,
+              'epsilon_mid': epsilon_mid, 'epsilon_min': epsilon_min, 'decay_split': decay_split,
+              'count_buckets': count_buckets, 'remaining_buckets': remaining_buckets}
+    start = 0
+    # exploration draws come in blocks of uniforms; draws_state is the agent generator's state before the current block
+    draws_state = agent_rng.bit_generator.state
+    draws = agent_rng.random(DRAW_BLOCK).tolist()
+    draw = 0
+
+    if resume_from is not None:
+        saved = checkpoint.load_checkpoint(resume_from)
+        Q = saved['Q']
+        start = saved['episode']
+        epsilon = saved['epsilon']
+        accuracies = saved['accuracies']
+        checkpoint_Qs = saved['checkpoint_Qs']
+        checkpoint_episodes = saved['checkpoint_episodes']
+        if tracker is not None:
+            tracker.replay(checkpoint_Qs, checkpoint_episodes)
+        if not full_snapshots and not log_dir:
+            checkpoint_Qs = [] # replayed into the tracker's delta log
+        counters = saved['counters']
+        diffs, prev, win_amt, total_return = counters['diffs'], counters['prev'], counters['win_amt'], counters['total_return']
+        environment.deck = saved['data']['deck'].tolist()
+        environment._shoe_buffer = saved['data']['shoe_buffer'].copy()
+        environment.bankroll = saved['data']['bankroll'].item()
+        environment.running_count = int(saved['data']['running_count'])
+        rng_states = saved['rng_states']
+        environment.rng.bit_generator.state = rng_states['environment']
+        eval_rng.bit_generator.state = rng_states['eval']
+        agent_rng.bit_generator.state = draws_state = rng_states['agent_draws']
+        draws = agent_rng.random(DRAW_BLOCK).tolist()
+        draw = counters['draw']
+
+    def save(episode):
+        counters = {'diffs': diffs, 'prev': prev, 'win_amt': win_amt, 'total_return': total_return, 'draw': draw}
+        rng_states = {'agent_draws': draws_state, 'eval': eval_rng.bit_generator.state}
+        snapshots = checkpoint_Qs if full_snapshots or log else tracker.snapshots
+        checkpoint.save_checkpoint(autosave_path, Q, episode, epsilon, accuracies, snapshots, checkpoint_episodes,
+                                   environment, counters, config, rng_states)
+
+    log = train_log.TrainLog(log_dir) if log_dir else None
+    if log:
+        log.start(start, config)
+    block = [0, 0, 0] # episodes, wins and return since the last logged aggregate
+    def flush_block(episode):
+        if log and block[0]:
+            log.episodes(episode, block[0], block[1], block[2], epsilon, environment.bankroll)
+            block[:] = [0, 0, 0]
+
+    finished = start # number of episodes played
+    timed = instrument is not None
+    if timed:
+        timers = instrument.timers
+        clock = time.perf_counter
+        instrument.start()
+    for epi in range(start, episodes):
+        if timed:
+            instrument.episode_start(epi)
+
+        bet = 1 # standard bet
+        environment.place_bet(bet)
+
+        state = environment.start_game()
+        done = False
+        total_reward = 0
+        steps = 0
+
+        while not done:
+            if timed:
+                t0 = clock()
+            q_values = Q.touch(state) # row of Q-values for this state
+
+            # epsilon-greedy action selection (action index into environment.actions);
+            # a draw below epsilon also picks the random action, so each step takes a single draw
+            if draw == len(draws):
+                draws_state = agent_rng.bit_generator.state
+                draws = agent_rng.random(DRAW_BLOCK).tolist()
+                draw = 0
+            u = draws[draw]
+            draw += 1
+            if u < epsilon:
+                action = min(int(u / epsilon * num_actions), num_actions - 1)
+            else:
+                action = Q.greedy_action(state)
+            if timed:
+                t1 = clock()
+            next_state, reward, done = environment.step(action)
+            if timed:
+                t2 = clock()
+            total_reward += reward
+            steps += 1
+
+            # updating state tracking
+            Q.visit(state)
+
+            if done:
+                target = reward # TD update for terminal state
+            else:
+                Q.touch(next_state)
+                target = reward + gamma * Q.max_value(next_state) # non-terminal state
+            q_values[action] += alpha * (target - q_values[action])
+
+            state = next_state
+            if timed:
+                timers['action_selection'] += t1 - t0
+                timers['env_step'] += t2 - t1
+                timers['td_update'] += clock() - t2
+
+        win_amt += 1 if total_reward > 0 else 0
+        total_return += total_reward
+        if log:
+            block[0] += 1
+            block[1] += 1 if total_reward > 0 else 0
+            block[2] += total_reward
+
+        # Can uncomment for detailed episode logs
+        # player_total, _ = environment.calculate_hand_value(environment.player_hand)
+        # dealer_total, _ = environment.calculate_hand_value(environment.dealer_hand)
+        # print(f"Episode {epi+1} ended. Player total: {player_total}, Dealer total: {dealer_total}, Reward: {total_reward}")
+
+        # Phased decay epsilon
+        rate = rate_first if epi <= decay_split*episodes else rate_rest
+        epsilon = max(epsilon_min, epsilon * rate)
+
+        # replenish bankroll for training purposes
+        if environment.bankroll <= 10:
+            now = epi
+            environment.bankroll += 100
+            if log:
+                log.replenish(epi+1, now-prev)
+            else:
+                diffs.append(now-prev)
+            prev = now
+            if timed:
+                instrument.counters['replenishments'] += 1
+
+        finished = epi+1
+        if finished % log_every == 0:
+            flush_block(finished)
+
+        # check accuracy every 2500 episodes, after the episode (like learners.run_episodes)
+        stop = False
+        if finished % 2500 == 0:
+            # Can uncomment for logging
+            # print("Checking accuracy at episode ", finished)
+            if timed:
+                t0 = clock()
+            check_accuracy(Q, accuracies, episodes=2500, seed=eval_rng)
+            if timed:
+                t1 = clock()
+                timers['accuracy_eval'] += t1 - t0
+            if log:
+                flush_block(finished)
+                log.snapshot(finished, Q, accuracies[-1])
+            elif full_snapshots:
+                checkpoint_Qs.append(Q.snapshot())
+            if tracker is not None:
+                metrics = tracker.record(finished, Q)
+                if log:
+                    log.write(dict(metrics, type='convergence'))
+            if timed:
+                timers['checkpoint_copy'] += clock() - t1
+            checkpoint_episodes.append(finished)
+            stop = ((stop_check is not None and stop_check(finished, accuracies))
+                    or (tracker is not None and tracker.converged))
+
+        if timed:
+            instrument.episode_end(finished, steps, epsilon, Q)
+        if autosave_path and finished % autosave_every == 0:
+            if timed:
+                t0 = clock()
+            flush_block(finished) # so a run resumed from this save has logged every episode before it
+            save(finished)
+            if timed:
+                timers['autosave'] += clock() - t0
+        if stop:
+            break
+
+    if autosave_path:
+        flush_block(finished)
+        save(finished)
+    if timed:
+        instrument.close(finished, Q)
+    if log:
+        flush_block(finished)
+        log.finish(finished, Q)
+        return train_log.TrainResult(log_dir)
+    if not full_snapshots:
+        checkpoint_Qs = tracker.snapshots
+    state_visits = Q.state_visits()
+    return Q, state_visits, diffs, win_amt, total_return, accuracies, checkpoint_Qs, checkpoint_episodes
+
+def train_learner(learner='q_learning', alpha=0.1, gamma=0.9, epsilon=1.0, episodes=50000, num_envs=1024,
+                  epsilon_mid=0.1, epsilon_min=0.01, decay_split=0.1, checkpoint_every=2500, stop_check=None,
+                  seed=None, tracker=None, full_snapshots=False, **learner_args):
+    """
+    Trains any learner from learners.py with the shared episode driver (learners.run_episodes), on num_envs
+    tables of a BatchBlackjackEnviron played at once, or on a single BlackjackEnviron with num_envs=None.
+    Epsilon follows the same two-phase schedule as train(), and accuracy is checked and a snapshot taken
+    every checkpoint_every episodes, so learners can be compared by the episodes they need to reach an accuracy.
+
+    Args:
+        learner: name of the learner in learners.LEARNERS ('q_learning', 'expected_sarsa', 'monte_carlo' or 'random').
+        alpha: Learning rate (None for sample averages with 'monte_carlo').
+        gamma: Discount factor for future rewards.
+        epsilon: Initial exploration rate for epsilon-greedy action selection.
+        episodes: Number of training episodes.
+        num_envs: Number of tables played at once, or None for the scalar environment.
+        epsilon_mid: Exploration rate reached at the end of the first decay phase.
+        epsilon_min: Exploration rate reached at the end of training (and its floor).
+        decay_split: Fraction of episodes spent in the first decay phase.
+        checkpoint_every: Number of episodes between accuracy checks and snapshots (2500 in train()). The checks
+            cost more than batched training itself, so long runs can space them out.
+        stop_check: Optional function called at every checkpoint as stop_check(episode, accuracies);
+            training stops early if it returns True.
+        seed: Seed (or numpy Generator) for the run; independent streams are spawned from it for the shoes,
+            the exploration draws and the accuracy checks.
+        tracker: Optional convergence.ConvergenceTracker to store the checkpoints with and stop on, as in train().
+        full_snapshots: Keep full copies of the Q-table at the checkpoints instead of a delta log, as in train().
+        learner_args: extra keyword arguments for the learner (e.g. collisions).
+    Returns: the same tuple as train() (diffs is only recorded with the scalar environment), followed by
+        the number of episodes played. A batched run finishes the episodes of its last step, so this can be
+        more than `episodes` (or the last checkpoint's episode, if training stopped early).
+    """
+    env_rng, agent_rng, eval_rng = np.random.default_rng(seed).spawn(3)
+    if tracker is None and not full_snapshots:
+        tracker = convergence.ConvergenceTracker(window=None)
+    if num_envs is None:
+        environment = blackjack_environ.BlackjackEnviron(seed=env_rng)
+    else:
+        environment = blackjack_environ.BatchBlackjackEnviron(num_envs, seed=env_rng)
+    learner_class = learners.LEARNERS[learner]
+    if learner_class is learners.RandomLearner:
+        agent = learner_class(environment.actions, **learner_args)
+    else:
+        agent = learner_class(environment.actions, alpha=alpha, gamma=gamma, **learner_args)
+    accuracies = []
+    checkpoint_Qs = []
+    checkpoint_episodes = []
+
+    def check(episode, Q):
+        check_accuracy(Q, accuracies, episodes=2500, seed=eval_rng)
+        if full_snapshots:
+            checkpoint_Qs.append(Q.snapshot())
+        if tracker is not None:
+            tracker.record(episode, Q)
+        checkpoint_episodes.append(episode)
+        if tracker is not None and tracker.converged:
+            return True
+        return stop_check is not None and stop_check(episode, accuracies)
+
+    diffs, win_amt, total_return, finished = learners.run_episodes(
+        agent, environment, episodes, agent_rng, epsilon, epsilon_mid, epsilon_min, decay_split, check, checkpoint_every)
+    Q = agent.Q
+    if not full_snapshots:
+        checkpoint_Qs = tracker.snapshots
+    return Q, Q.state_visits(), diffs, win_amt, total_return, accuracies, checkpoint_Qs, checkpoint_episodes, finished
+
+def train_batched(alpha=0.1, gamma=0.9, epsilon=1.0, episodes=50000, num_envs=1024, epsilon_mid=0.1, epsilon_min=0.01,
+                  decay_split=0.1, collisions='compound', checkpoint_every=2500, stop_check=None, seed=None):
+    """
+    Trains a Q-learning agent like train(), but steps num_envs tables of a BatchBlackjackEnviron at once and
+    applies the Q-learning updates of a whole step with NumPy scatter operations instead of one at a time
+    (learners.QLearner run by train_learner). Epsilon-greedy selection is vectorized over the tables (one
+    uniform draw per table, as in train()) and epsilon follows the same two-phase schedule over the episodes
+    finished so far (see learners.epsilon_schedule).
+
+    All updates of a step bootstrap from the Q-values before the step. Updates that collide on the same
+    state-action pair are combined according to `collisions` (see learners.scatter_update): 'compound'
+    averages the targets and applies them as that many sequential updates (the default), 'mean' applies one
+    alpha step towards the mean target and 'sum' adds every update with np.add.at (only stable for small batches).
+
+    The bet is always 1 and there is no bankroll, so no replenishment gaps are recorded. Training stops at the
+    first step where at least `episodes` episodes have finished, so up to num_envs - 1 more may be counted.
+
+    Args:
+        alpha, gamma, epsilon, episodes, epsilon_mid, epsilon_min, decay_split, stop_check, seed: as in train().
+        num_envs: Number of tables played at once.
+        collisions: How colliding updates are combined: 'compound', 'mean' or 'sum'.
+        checkpoint_every: Number of episodes between accuracy checks and snapshots (2500 in train()).
+    Returns: the same tuple as train_learner() (diffs is empty), ending with the number of episodes played.
+    """
+    return train_learner('q_learning', alpha, gamma, epsilon, episodes, num_envs, epsilon_mid, epsilon_min, decay_split,
+                         checkpoint_every, stop_check, seed, collisions=collisions)
+
+def train_run(seed, config):
+    """
+    Runs one seeded training job. Kept at module level so it can be sent to worker processes.
+
+    Args:
+        seed: seed (or numpy SeedSequence/Generator) the run's random streams are spawned from (see train).
+        config: dictionary of keyword arguments for train().
+    Returns: dictionary of compact results for the run (Q arrays, accuracy curve, win rate).
+    """
+    Q, state_visits, diffs, win_amt, total_return, accuracies, checkpoint_Qs, checkpoint_episodes = train(seed=seed, **config)
+    episodes = config.get('episodes', 50000)
+    return {
+        'seed': seed,
+        'config': config,
+        'q_values': Q.values,
+        'seen': Q.seen,
+        'visits': Q.visits,
+        'accuracies': np.array(accuracies),
+        'checkpoint_episodes': checkpoint_episodes,
+        'win_rate': win_amt / episodes,
+        'avg_return': total_return / episodes,
+    }
+
+def train_many(seeds, configs=None, workers=None):
+    """
+    Runs independent training jobs (every seed for every config) in a process pool.
+    Each job spawns its own random streams from its seed, so results do not depend on which worker runs it.
+    For many independent runs from one root seed, pass np.random.SeedSequence(root).spawn(n) as the seeds.
+
+    Args:
+        seeds: list of integer seeds (or SeedSequences).
+        configs: list of dictionaries of keyword arguments for train() (default: one config with train() defaults).
+        workers: number of worker processes (None uses all cores, 1 runs everything in this process).
+    Returns: 
+        runs: list of per-run results from train_run, in (config, seed) order.
+        summaries: list of aggregated results (see aggregate_runs), one per config.
+    """
+    if configs is None:
+        configs = [{}]
+    jobs = [(seed, config) for config in configs for seed in seeds]
+    if workers == 1:
+        runs = [train_run(seed, config) for seed, config in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            runs = list(pool.map(train_run, *zip(*jobs)))
+    summaries = [aggregate_runs(runs[i*len(seeds):(i+1)*len(seeds)]) for i in range(len(configs))]
+    return runs, summaries
+
+def aggregate_runs(runs, z=1.96):
+    """
+    Aggregates runs of the same config into mean curves with confidence intervals and a consensus policy.
+
+    Args:
+        runs: list of results from train_run.
+        z: z-score for the confidence intervals (1.96 for 95%).
+    Returns: dictionary with mean/CI of the accuracy curve, win rate and average return,
+        and the consensus policy (majority vote of greedy actions, -1 where no run saw the state).
+    """
+    n = len(runs)
+    def mean_ci(values):
+        values = np.asarray(values, dtype=float)
+        mean = values.mean(axis=0)
+        half = z * values.std(axis=0, ddof=1) / np.sqrt(n) if n > 1 else np.zeros_like(mean)
+        return mean, half
+
+    acc_mean, acc_ci = mean_ci([run['accuracies'] for run in runs])
+    win_mean, win_ci = mean_ci([run['win_rate'] for run in runs])
+    ret_mean, ret_ci = mean_ci([run['avg_return'] for run in runs])
+
+    # majority vote over the runs that saw each state (ties go to the first action, like greedy_action)
+    greedy = np.stack([run['q_values'].argmax(axis=-1) for run in runs])
+    seen = np.stack([run['seen'] for run in runs])
+    num_actions = runs[0]['q_values'].shape[-1]
+    votes = np.stack([((greedy == a) & seen).sum(axis=0) for a in range(num_actions)], axis=-1)
+    num_seen = seen.sum(axis=0)
+    consensus = np.where(num_seen > 0, votes.argmax(axis=-1), -1)
+    consensus_share = np.where(num_seen > 0, votes.max(axis=-1) / np.maximum(num_seen, 1), np.nan)
+
+    return {
+        'config': runs[0]['config'],
+        'num_runs': n,
+        'checkpoint_episodes': runs[0]['checkpoint_episodes'],
+        'accuracy_mean': acc_mean,
+        'accuracy_ci': acc_ci,
+        'win_rate_mean': win_mean,
+        'win_rate_ci': win_ci,
+        'avg_return_mean': ret_mean,
+        'avg_return_ci': ret_ci,
+        'consensus_policy': consensus,
+        'consensus_share': consensus_share,
+    }
+
+# train() arguments each sweep trial sets itself, so they cannot be part of a search space
+SWEEP_RESERVED = ('episodes', 'seed', 'stop_check')
+
+def _plain(value):
+    # NumPy scalars (e.g. from np.linspace grids) as Python numbers, so configs can be written as JSON
+    return value.item() if isinstance(value, np.generic) else value
+
+def sweep_configs(space, method='grid', num_samples=20, sample_seed=0):
+    """
+    Builds the list of configs to try from a search space.
+
+    Args:
+        space: dictionary mapping train() keyword arguments to candidate values. For 'grid', values are lists.
+            For 'random' and 'halving', a list is sampled uniformly and a (low, high) tuple is sampled uniformly in that range.
+        method: 'grid' (every combination), or 'random'/'halving' (num_samples random configs).
+        num_samples: number of configs to sample for 'random' and 'halving'.
+        sample_seed: seed for sampling configs.
+    Returns: list of config dictionaries (with NumPy scalars converted to Python numbers).
+    Raises: ValueError if the space contains an argument the sweep sets itself (see SWEEP_RESERVED); the
+        training episodes and seeds are given to sweep instead.
+    """
+    reserved = sorted(set(space) & set(SWEEP_RESERVED))
+    if reserved:
+        raise ValueError(f"The search space cannot set {', '.join(reserved)}: use the episodes and seeds arguments of sweep")
+    names = sorted(space)
+    if method == 'grid':
+        return [{name: _plain(value) for name, value in zip(names, values)}
+                for values in itertools.product(*(space[name] for name in names))]
+    if method not in ('random', 'halving'):
+        raise ValueError(f"Unknown sweep method: {method}")
+    rng = np.random.default_rng(sample_seed)
+    configs = []
+    for _ in range(num_samples):
+        config = {}
+        for name in names:
+            values = space[name]
+            if isinstance(values, tuple):
+                config[name] = float(rng.uniform(*values))
+            else:
+                config[name] = _plain(values[rng.integers(len(values))])
+        configs.append(config)
+    return configs
+
+def sweep_trial(config, seed, episodes, eval_episodes=20000, median_curve=None, grace=4, window=3, agreement_weight=0.1):
+    """
+    Trains and scores one sweep trial. Kept at module level so it can be sent to worker processes.
+
+    Args:
+        config: dictionary of keyword arguments for train().
+        seed: seed for the trial's training and scoring streams.
+        episodes: number of training episodes for this trial.
+        eval_episodes: number of hands used by check_accuracy to score the final policy.
+        median_curve: accuracy curve of the median finished trial with the same episodes; if given, the trial
+            stops early once its recent accuracy (mean of the last `window` checkpoints) falls below the median's.
+        grace: number of checkpoints before early stopping may happen.
+        window: number of checkpoints averaged when comparing against the median.
+        agreement_weight: weight of basic strategy agreement in the score (score = EV + weight * agreement).
+    Returns: dictionary describing the trial (config, accuracies, EV, agreement, score, ...).
+    """
+    train_seed, score_seed = np.random.SeedSequence(seed).spawn(2)
+    stop_check = None
+    if median_curve is not None:
+        def stop_check(episode, accuracies):
+            k = len(accuracies)
+            if k < grace or k > len(median_curve):
+                return False
+            return np.mean(accuracies[-window:]) < np.mean(median_curve[max(0, k-window):k])
+
+    Q, state_visits, diffs, win_amt, total_return, accuracies, checkpoint_Qs, checkpoint_episodes = train(
+        episodes=episodes, stop_check=stop_check, seed=train_seed, **config)
+    episodes_run = checkpoint_episodes[-1] if checkpoint_episodes else episodes
+    stopped_early = episodes_run < episodes
+
+    returns = []
+    win_rate = check_accuracy(Q, [], episodes=eval_episodes, returns=returns, seed=score_seed)
+    agreement = policy_agreement(q_to_grids(Q))
+    agree = np.concatenate([agreement['agree_hard'].ravel(), agreement['agree_soft'].ravel()])
+    agreement_all = float(np.nanmean(agree))
+    return {
+        'config': {name: _plain(value) for name, value in config.items()},
+        'seed': _plain(seed),
+        'episodes': _plain(episodes),
+        'episodes_run': int(episodes_run),
+        'stopped_early': bool(stopped_early),
+        'accuracies': [float(a) for a in accuracies],
+        'win_rate': float(win_rate),
+        'avg_return': float(returns[0]),
+        'agreement': agreement_all,
+        'score': float(returns[0] + agreement_weight * agreement_all),
+    }
+
+def _trial_key(config, seed, episodes):
+    return json.dumps([{name: _plain(value) for name, value in config.items()}, _plain(seed), _plain(episodes)],
+                      sort_keys=True)
+
+def load_ledger(ledger_path):
+    """
+    Reads finished trials from a sweep ledger (one JSON record per line).
+    Returns: dictionary mapping trial keys to records.
+    """
+    records = {}
+    if ledger_path and os.path.exists(ledger_path):
+        with open(ledger_path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    records[record['key']] = record
+    return records
+
+def sweep(space, method='grid', num_samples=20, seeds=(0,), episodes=50000, min_episodes=5000, eta=3,
+          ledger_path='sweep_ledger.jsonl', workers=None, eval_episodes=20000, early_stop=True,
+          min_finished=3, sample_seed=0):
+    """
+    Sweeps train() hyperparameters (alpha, gamma, epsilon schedule, ...) and ranks configs by their score,
+    the EV from check_accuracy plus a small weight on basic strategy agreement (see sweep_trial).
+    Finished trials are appended to a JSONL ledger, so an interrupted sweep can be resumed by calling it again.
+
+    With method='halving' (successive halving), all configs are first trained for min_episodes,
+    then the best 1/eta of them are retrained with eta times more episodes, until the episodes budget is reached.
+    With early_stop, trials whose accuracy falls below the median finished trial are stopped early.
+
+    Args:
+        space: search space (see sweep_configs).
+        method: 'grid', 'random' or 'halving'.
+        num_samples: number of sampled configs for 'random' and 'halving'.
+        seeds: seeds to run each config with; the score of a config is the mean over seeds.
+        episodes: training episodes per trial (the final budget for 'halving').
+        min_episodes: training episodes in the first round of 'halving'.
+        eta: reduction factor for 'halving'.
+        ledger_path: path of the JSONL ledger of finished trials.
+        workers: number of worker processes (None uses all cores, 1 runs everything in this process).
+        eval_episodes: number of hands used to score each trained policy.
+        early_stop: whether to stop trials early using the median stopping rule.
+        min_finished: number of finished trials needed before early stopping starts.
+        sample_seed: seed for sampling configs.
+    Returns: list of (mean score, config, records) tuples from the last round, best first.
+    """
+    configs = sweep_configs(space, method, num_samples, sample_seed)
+    ledger = load_ledger(ledger_path)
+
+    if method == 'halving':
+        budgets = []
+        budget = min_episodes
+        while budget < episodes:
+            budgets.append(budget)
+            budget *= eta
+        budgets.append(episodes)
+    else:
+        budgets = [episodes]
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    try:
+        for rung, budget in enumerate(budgets):
+            records = _run_sweep_round(configs, seeds, budget, ledger, ledger_path, pool, workers or os.cpu_count(),
+                                       eval_episodes, early_stop, min_finished)
+            ranked = []
+            for config in configs:
+                config_records = [records[_trial_key(config, seed, budget)] for seed in seeds]
+                ranked.append((float(np.mean([r['score'] for r in config_records])), config, config_records))
+            ranked.sort(key=lambda item: item[0], reverse=True)
+            # Can uncomment for logging
+            # print(f"Round {rung}: {len(configs)} configs at {budget} episodes, best score {ranked[0][0]:.4f}")
+            if rung < len(budgets) - 1:
+                configs = [config for _, config, _ in ranked[:max(1, len(ranked) // eta)]]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return ranked
+
+def _run_sweep_round(configs, seeds, budget, ledger, ledger_path, pool, max_running, eval_episodes, early_stop, min_finished):
+    """
+    Runs every (config, seed) trial of one sweep round that is not already in the ledger.
+    Returns: dictionary mapping trial keys of this round to their records.
+    """
+    pending = [(config, seed) for config in configs for seed in seeds if _trial_key(config, seed, budget) not in ledger]
+
+    def median_curve():
+        # accuracy curve of the median (by final accuracy) finished trial with this budget
+        if not early_stop:
+            return None
+        curves = [r['accuracies'] for r in ledger.values() if r['episodes'] == budget and not r['stopped_early']]
+        if len(curves) < min_finished:
+            return None
+        return np.median(np.array(curves), axis=0)
+
+    def record(result):
+        result['key'] = _trial_key(result['config'], result['seed'], result['episodes'])
+        ledger[result['key']] = result
+        if ledger_path:
+            with open(ledger_path, 'a') as f:
+                f.write(json.dumps(result) + '\n')
+
+    if pool is None:
+        for config, seed in pending:
+            record(sweep_trial(config, seed, budget, eval_episodes, median_curve()))
+    else:
+        # submit lazily so later trials are compared against the trials finished so far
+        running = set()
+        while pending or running:
+            while pending and len(running) < max_running:
+                config, seed = pending.pop(0)
+                running.add(pool.submit(sweep_trial, config, seed, budget, eval_episodes, median_curve()))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                record(future.result())
+
+    return {_trial_key(config, seed, budget): ledger[_trial_key(config, seed, budget)] for config in configs for seed in seeds}
+
+# useful for testing and comparison
+def random_agent(seed=None):
+    """
+    Institutes a random action agent playing Blackjack for comparison, with the shared episode driver
+    (learners.run_episodes) and learners.RandomLearner.
+    Args:
+        seed: Seed (or numpy Generator) for the shoe and the random actions.
+    Returns: diffs: a list of episode amts between bankroll replenishments.
+    """
+    env_rng, agent_rng = np.random.default_rng(seed).spawn(2)
+    environment = blackjack_environ.BlackjackEnviron(seed=env_rng)
+    episodes = 50000 # number of training episodes
+    diffs_rand, _, _, _ = learners.run_episodes(learners.RandomLearner(environment.actions), environment, episodes, agent_rng)
+    return diffs_rand
+
+def basic_strategy_action(player_sum, dealer_upcard, usable_ace):
+    """
+    Returns decision on action based on basic blackjack strategy.
+    
+    Args:
+        player_sum: sum of player's hand values.
+        dealer_upcard: the value shown on dealer's upcard.
+        usable_ace: flag indicating if player has a usable ace.
+    Returns: action: a string 'hit' or 'stand'.
+    """
+    # Hard totals
+    if not usable_ace:
+        if player_sum >= 17:
+            return 'stand'
+        if 13 <= player_sum <= 16:
+            if 2 <= dealer_upcard <= 6:
+                return 'stand'
+            else:
+                return 'hit'
+        if player_sum == 12:
+            if 4 <= dealer_upcard <= 6:
+                return 'stand'
+            else:
+                return 'hit'
+        # 11 or less
+        return 'hit'
+    # Soft totals (usable ace)
+    else:
+        if player_sum >= 19:
+            return 'stand'
+        if player_sum == 18:
+            if 2 <= dealer_upcard <= 8:
+                return 'stand'
+            else:
+                return 'hit'
+        # soft 17 or less: hit
+        return 'hit'
+
+def basic_strategy_policy():
+    """
+    Returns: basic strategy as an array of action indices (0 = hit, 1 = stand) per (player total, dealer upcard,
+        usable ace), -1 outside the playable totals 4-21, like solver.solve().policy.
+    """
+    policy = np.full((q_table.NUM_TOTALS, q_table.NUM_UPCARDS, 2), -1)
+    for total in range(4, 22):
+        for upcard in range(2, 12):
+            for usable in (0, 1):
+                policy[total, upcard, usable] = 0 if basic_strategy_action(total, upcard, bool(usable)) == 'hit' else 1
+    return policy
+
+def check_accuracy(Q, accuracies, episodes=1000, returns=None, ci_width=None, seed=None):
+    """
+    With epsilon at 0 and no learning, we check how often the agent wins. 
+    Using max Q-values for action selection (random action for unseen states).
+    A fixed number of hands is played by the compiled kernel of policy_kernel.evaluate_hands (or its NumPy
+    fallback without Numba); with ci_width, hands are played in vectorized batches by evaluator.evaluate_policy.
+    
+    Args:
+        Q: QTable mapping states to action values.
+        accuracies: list to append accuracy results of this function to.
+        episodes: batch number of episodes to test for accuracy (the maximum if ci_width is given).
+        returns: optional list to append the average return per hand (EV) to.
+        ci_width: optional target width of the 95% confidence intervals; stops before `episodes` hands once met.
+        seed: seed (or numpy Generator) for the shoes and the random actions of unseen states.
+    Returns: accuracy over the hands played.
+    """
+    if ci_width is None:
+        result = policy_kernel.evaluate_hands(Q, episodes, seed=seed)
+    else:
+        result = evaluator.evaluate_policy(Q, ci_width=ci_width, max_hands=episodes, min_hands=min(episodes, 10000),
+                                           batch_size=min(episodes, 20000), seed=seed)
+    accuracy = result['win_rate']
+    accuracies.append(accuracy)
+    if returns is not None:
+        returns.append(result['ev'])
+    # Can uncomment for logging
+    # print(f"Accuracy over {result['hands']} episodes: {accuracy} (+/- {result['win_rate_ci']:.4f})")
+    return accuracy
+
+def eval(win_amt, total_return, episodes):
+    """
+    Prints win rate and average return per hand.
+    """
+    print("Win rate: ", win_amt / episodes)
+    print("Average return per hand: ", total_return / episodes)
+
+
+def understanding_q(Q, state_visits):
+    """
+    Simply prints out the learned strategy from the Q-table for analysis.
+    """
+    strategy = {}
+    for state, actions in sorted(Q.items()):
+        # Choose the action with the highest Q-value for each state
+        optimal_action = max(actions, key=actions.get)
+        strategy[state] = optimal_action
+        print(f"State {state}: {optimal_action} with Q-values {actions}, visited {state_visits.get(state)} times")
+
+def analyze_state_visits(state_visits):
+    """
+    Useful for determining how much exploration is needed by printing underexplored states.
+    """
+    for state, count in state_visits.items():
+        if count < 50:
+            print(f"Underexplored state: {state} with {count} visits")
+
+# rows = player total, cols = dealer upcard
+GRID_PLAYER_RANGE = range(5, 22)
+GRID_DEALER_RANGE = range(1, 12)
+
+def _q_arrays(Q):
+    """
+    Gets hit/stand Q-values and coverage for the grid cells in one pass over the Q-table.
+    Works with a QTable (array slices) or a dict Q-table ({state: {action: value}}), where values
+    of keys that map to the same cell are averaged. A CountQTable is first averaged over the count.
+    Returns: hit values, stand values and covered mask, each of shape (player, dealer, usable ace).
+    """
+    p0, p1 = GRID_PLAYER_RANGE.start, GRID_PLAYER_RANGE.stop
+    d0, d1 = GRID_DEALER_RANGE.start, GRID_DEALER_RANGE.stop
+    if isinstance(Q, q_table.CountQTable):
+        Q = Q.collapse()
+    if isinstance(Q, q_table.QTable):
+        cells = Q.values[p0:p1, d0:d1]
+        return cells[..., Q.actions.index('hit')], cells[..., Q.actions.index('stand')], Q.seen[p0:p1, d0:d1]
+
+    shape = (p1 - p0, d1 - d0, 2)
+    hit = np.zeros(shape)
+    stand = np.zeros(shape)
+    counts = np.zeros(shape)
+    for key, action_dict in Q.items():
+        # looking for correct format
+        try:
+            key_player, key_dealer, key_usable = key
+        except Exception:
+            continue
+        if p0 <= key_player < p1 and d0 <= key_dealer < d1 and 'hit' in action_dict and 'stand' in action_dict:
+            cell = (key_player - p0, key_dealer - d0, 1 if key_usable else 0)
+            hit[cell] += action_dict['hit']
+            stand[cell] += action_dict['stand']
+            counts[cell] += 1
+    covered = counts > 0
+    np.divide(hit, counts, out=hit, where=covered)
+    np.divide(stand, counts, out=stand, where=covered)
+    return hit, stand, covered
+
+def q_to_grid_stack(Qs):
+    """
+    Converts a list of Q-tables (e.g. checkpoint snapshots) into stacked grids for plotting & visualization.
+    Returns: same keys as q_to_grids, with grids of shape (number of Q-tables, player, dealer).
+    """
+    arrays = [_q_arrays(Q) for Q in Qs]
+    hit = np.stack([a[0] for a in arrays])
+    stand = np.stack([a[1] for a in arrays])
+    covered = np.stack([a[2] for a in arrays])
+    qdiff = np.where(covered, hit - stand, np.nan)
+    # 1 = hit, 0 = stand
+    pref = np.where(covered, (hit > stand).astype(float), np.nan)
+    return {
+        'player_range': list(GRID_PLAYER_RANGE),
+        'dealer_range': list(GRID_DEALER_RANGE),
+        'pref_hard': pref[..., 0],
+        'qdiff_hard': qdiff[..., 0],
+        'covered_hard': covered[..., 0],
+        'pref_soft': pref[..., 1],
+        'qdiff_soft': qdiff[..., 1],
+        'covered_soft': covered[..., 1]
+    }
+
+def q_to_grids(Q):
+    """
+    Converts Q-table into grid format for plotting & visualization.
+    """
+    stack = q_to_grid_stack([Q])
+    return {key: value if key.endswith('range') else value[0] for key, value in stack.items()}
+
+def policy_agreement(grids, reference=None):
+    """
+    Compares the policy grids from q_to_grids against basic strategy (no plotting).
+    Args:
+        grids: grids from q_to_grids.
+        reference: optional reference policy with the signature of basic_strategy_action,
+            e.g. solver.solve().action for the exact optimal policy (default: basic_strategy_action).
+    Returns: dictionary with agreement grids (1 = same action, NaN = not covered) and coverage/agreement fractions.
+    """
+    pr = grids['player_range']
+    dr = grids['dealer_range']
+    pref_hard = grids['pref_hard']
+    pref_soft = grids['pref_soft']
+    covered_hard = grids['covered_hard']
+    covered_soft = grids['covered_soft']
+    if reference is None:
+        reference = basic_strategy_action
+
+    agree_hard = np.full_like(pref_hard, np.nan)
+    agree_soft = np.full_like(pref_soft, np.nan)
+    for i, p in enumerate(pr):
+        for j, d in enumerate(dr):
+            if covered_hard[i, j]:
+                basic_action = reference(p, d, False)
+                learned = 'hit' if pref_hard[i, j] == 1 else 'stand'
+                agree_hard[i, j] = 1.0 if learned == basic_action else 0.0
+            if covered_soft[i, j]:
+                basic_action = reference(p, d, True)
+                learned = 'hit' if pref_soft[i, j] == 1 else 'stand'
+                agree_soft[i, j] = 1.0 if learned == basic_action else 0.0
+
+    return {
+        'agree_hard': agree_hard,
+        'agree_soft': agree_soft,
+        'coverage_hard': np.nanmean(covered_hard),
+        'coverage_soft': np.nanmean(covered_soft),
+        'agreement_hard': np.nanmean(agree_hard),
+        'agreement_soft': np.nanmean(agree_soft)
+    }
@@ -0,0 +1,180 @@
+import numpy as np
+from collections.abc import Mapping
+
+# player totals go up to 31 (hitting a hard 21 with a 10), dealer upcards are 2-11
+NUM_TOTALS = 32
+NUM_UPCARDS = 12
+
+class QTable(Mapping):
+    def __init__(self, actions=None, initial_value=1.0):
+        """
+        Dense Q-table backed by a NumPy array indexed by (player total, dealer upcard, usable ace, action).
+        It can also be read like the old dict-of-dicts Q-table ({state: {action: value}}),
+        where only states that have been seen during training are present.
+
+        Args:
+            actions: list of action names, in the same order as the environment's actions.
+            initial_value: initial Q-value of every state-action pair (optimistic by default).
+        """
+        self.actions = list(actions) if actions is not None else ['hit', 'stand']
+        self.initial_value = initial_value
+        self.values = np.full((NUM_TOTALS, NUM_UPCARDS, 2, len(self.actions)), initial_value, dtype=float)
+        self.visits = np.zeros((NUM_TOTALS, NUM_UPCARDS, 2), dtype=np.int64)
+        self.seen = np.zeros((NUM_TOTALS, NUM_UPCARDS, 2), dtype=bool)
+
+    @staticmethod
+    def index(state):
+        """
+        Converts a state (player total, dealer upcard, usable ace) to an array index.
+        The usable ace flag has to be an int, since NumPy treats a bool index as a mask.
+        """
+        return (state[0], state[1], 1 if state[2] else 0)
+
+    def touch(self, state):
+        """
+        Marks a state as seen (the equivalent of adding it to the dict Q-table).
+        Returns: the row of Q-values for the state (a view, so it can be updated in place).
+        """
+        idx = (state[0], state[1], 1 if state[2] else 0)
+        self.seen[idx] = True
+        return self.values[idx]
+
+    def greedy_action(self, state):
+        """
+        Returns: index of the action with the highest Q-value (ties go to the first action).
+        """
+        return int(self.values[state[0], state[1], 1 if state[2] else 0].argmax())
+
+    def max_value(self, state):
+        """
+        Returns: the highest Q-value of a state.
+        """
+        return self.values[state[0], state[1], 1 if state[2] else 0].max()
+
+    def visit(self, state):
+        """
+        Adds one visit to a state's visit count.
+        """
+        self.visits[state[0], state[1], 1 if state[2] else 0] += 1
+
+    def greedy_policy(self):
+        """
+        Returns: array of greedy action indices per (player total, dealer upcard, usable ace), -1 for unseen states.
+        """
+        return np.where(self.seen, self.values.argmax(axis=-1), -1)
+
+    def snapshot(self):
+        """
+        Returns: an independent copy of the Q-table, used for checkpoints.
+        """
+        snap = self.__class__.__new__(self.__class__)
+        snap.__dict__.update(self.__dict__)
+        snap.values = self.values.copy()
+        snap.visits = self.visits.copy()
+        snap.seen = self.seen.copy()
+        return snap
+
+    def state_visits(self):
+        """
+        Returns: dictionary mapping each visited state to its number of visits.
+        """
+        return {(int(p), int(d), bool(u)): int(self.visits[p, d, u]) for p, d, u in zip(*np.nonzero(self.visits))}
+
+    # dict-compatible (read-only) view: {state: {action: value}}
+    def __getitem__(self, state):
+        if state not in self:
+            raise KeyError(state)
+        return dict(zip(self.actions, self.values[self.index(state)].tolist()))
+
+    def __contains__(self, state):
+        try:
+            player_total, dealer_upcard, usable_ace = state
+            return bool(self.seen[player_total, dealer_upcard, 1 if usable_ace else 0])
+        except (TypeError, ValueError, IndexError):
+            return False
+
+    def __iter__(self):
+        for p, d, u in zip(*np.nonzero(self.seen)):
+            yield (int(p), int(d), bool(u))
+
+    def __len__(self):
+        return int(self.seen.sum())
+
+class CountQTable(QTable):
+    def __init__(self, actions=None, initial_value=1.0, count_buckets=5, remaining_buckets=None):
+        """
+        Dense Q-table for the card-counting state (player total, dealer upcard, usable ace, true count bucket
+        [, shoe remaining bucket]) from BlackjackEnviron(count_buckets=..., remaining_buckets=...).
+        The extra state dimensions are array axes, so lookups stay O(1) without dict overhead.
+
+        Args:
+            actions: list of action names, in the same order as the environment's actions.
+            initial_value: initial Q-value of every state-action pair.
+            count_buckets: true count limit k of the environment (counts go from -k to k).
+            remaining_buckets: number of shoe remaining buckets of the environment, if used.
+        """
+        self.actions = list(actions) if actions is not None else ['hit', 'stand']
+        self.initial_value = initial_value
+        self.count_buckets = count_buckets
+        self.remaining_buckets = remaining_buckets
+        extra = (2 * count_buckets + 1,) + ((remaining_buckets,) if remaining_buckets is not None else ())
+        shape = (NUM_TOTALS, NUM_UPCARDS, 2) + extra
+        self.values = np.full(shape + (len(self.actions),), initial_value, dtype=float)
+        self.visits = np.zeros(shape, dtype=np.int64)
+        self.seen = np.zeros(shape, dtype=bool)
+
+    def index(self, state):
+        """
+        Converts a counting state to an array index (the true count is offset so -k maps to 0).
+        """
+        return (state[0], state[1], 1 if state[2] else 0, state[3] + self.count_buckets) + tuple(state[4:])
+
+    def touch(self, state):
+        idx = self.index(state)
+        self.seen[idx] = True
+        return self.values[idx]
+
+    def greedy_action(self, state):
+        return int(self.values[self.index(state)].argmax())
+
+    def max_value(self, state):
+        return self.values[self.index(state)].max()
+
+    def visit(self, state):
+        self.visits[self.index(state)] += 1
+
+    def collapse(self):
+        """
+        Averages the Q-values over the count dimensions (weighted by visits) into a plain QTable,
+        e.g. to plot the count-independent policy with q_to_grids.
+        """
+        axes = tuple(range(3, self.visits.ndim))
+        weights = self.visits[..., None].astype(float)
+        total = weights.sum(axis=axes)
+        Q = QTable(self.actions, self.initial_value)
+        Q.values[:] = np.where(total > 0, (self.values * weights).sum(axis=axes) / np.maximum(total, 1), self.values.mean(axis=axes))
+        Q.visits[:] = self.visits.sum(axis=axes)
+        Q.seen[:] = self.seen.any(axis=axes)
+        return Q
+
+    def _state(self, idx):
+        p, d, u, c = (int(i) for i in idx[:4])
+        return (p, d, bool(u), c - self.count_buckets) + tuple(int(i) for i in idx[4:])
+
+    def state_visits(self):
+        return {self._state(idx): int(self.visits[idx]) for idx in zip(*np.nonzero(self.visits))}
+
+    def __getitem__(self, state):
+        if state not in self:
+            raise KeyError(state)
+        return dict(zip(self.actions, self.values[self.index(state)].tolist()))
+
+    def __contains__(self, state):
+        try:
+            return bool(self.seen[self.index(state)])
+        except (TypeError, ValueError, IndexError):
+            return False
+
+    def __iter__(self):
+        for idx in zip(*np.nonzero(self.seen)):
+            yield self._state(idx)
@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+from . import serving
+from .env import blackjack_environ
+from .agents import q_agent
+from .evaluation import evaluator
+from .evaluation import policy_kernel
+from .solvers import solver
+
+def _best_time(run, repeats):
+    # best (lowest) wall-clock time of several runs, the least noisy estimate of the cost
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times), times
+
+def _rate(amount, unit, run, repeats):
+    best, times = _best_time(run, repeats)
+    return {'value': amount / best, 'unit': unit, 'higher_is_better': True, 'times': times}
+
+def _latency(run, repeats):
+    best, times = _best_time(run, repeats)
+    return {'value': best, 'unit': 's', 'higher_is_better': False, 'times': times}
+
+def bench_env_step(quick, repeats):
+    """
+    Hands per second of BlackjackEnviron.step, hitting below 17.
+    """
+    hands = 20000 if quick else 200000
+    def run():
+        env = blackjack_environ.BlackjackEnviron(seed=0)
+        for _ in range(hands):
+            env.place_bet(1)
+            state = env.start_game()
+            done = False
+            while not done:
+                state, reward, done = env.step(blackjack_environ.HIT if state[0] < 17 else blackjack_environ.STAND)
+            env.bankroll = 100
+    return _rate(hands, 'hands/s', run, repeats)
+
+def bench_batch_env_step(quick, repeats):
+    """
+    Hands per second of BatchBlackjackEnviron.step (20000 tables), hitting below 17.
+    """
+    steps = 20 if quick else 200
+    hands = []
+    def run():
+        env = blackjack_environ.BatchBlackjackEnviron(20000, seed=0)
+        states = env._get_states()
+        played = 0
+        for _ in range(steps):
+            states, rewards, dones = env.step(np.where(states[:, 0] < 17, blackjack_environ.HIT, blackjack_environ.STAND))
+            played += int(dones.sum())
+        hands.append(played)
+    result = _latency(run, repeats)
+    # every run is seeded the same, so it plays the same number of hands
+    return {'value': hands[0] / result['value'], 'unit': 'hands/s', 'higher_is_better': True, 'times': result['times']}
+
+def bench_hand_value(quick, repeats):
+    """
+    Calls per second of calculate_hand_value on 2-4 card hands of integer cards.
+    """
+    rng = np.random.default_rng(0)
+    count = 20000 if quick else 200000
+    hands = [rng.integers(0, 52, size=rng.integers(2, 5)).tolist() for _ in range(count)]
+    env = blackjack_environ.BlackjackEnviron(seed=0)
+    def run():
+        for hand in hands:
+            env.calculate_hand_value(hand)
+    return _rate(count, 'calls/s', run, repeats)
+
+def bench_train(quick, repeats):
+    """
+    Episodes per second of a full train() run (including its accuracy checks).
+    """
+    episodes = 10000 if quick else 50000
+    return _rate(episodes, 'episodes/s', lambda: q_agent.train(episodes=episodes, seed=0), repeats)
+
+def bench_train_batched(quick, repeats):
+    """
+    Episodes per second of train_batched() (1024 tables), with a single accuracy check at the end.
+    """
+    episodes = 100000 if quick else 1000000
+    return _rate(episodes, 'episodes/s', lambda: q_agent.train_batched(episodes=episodes, checkpoint_every=episodes, seed=0), repeats)
+
+def bench_check_accuracy(quick, repeats):
+    """
+    Latency of one check_accuracy call as made during training (2500 hands).
+    """
+    Q = solver.solve().to_qtable()
+    return _latency(lambda: q_agent.check_accuracy(Q, [], episodes=2500, seed=0), repeats)
+
+def bench_evaluate_policy(quick, repeats):
+    """
+    Hands per second of evaluator.evaluate_policy with a fixed number of hands.
+    """
+    hands = 200000 if quick else 2000000
+    policy = solver.solve().policy
+    return _rate(hands, 'hands/s', lambda: evaluator.evaluate_policy(policy, ci_width=None, max_hands=hands, seed=0), repeats)
+
+def bench_policy_kernel(quick, repeats):
+    """
+    Hands per second of policy_kernel.evaluate_hands with its fastest backend (compiled before timing).
+    """
+    hands = 200000 if quick else 2000000
+    policy = solver.solve().policy
+    policy_kernel.evaluate_hands(policy, 1000, seed=0)
+    return _rate(hands, 'hands/s', lambda: policy_kernel.evaluate_hands(policy, hands, seed=0), repeats)
+
+def bench_policy_lookup(quick, repeats):
+    """
+    States per second of CompiledPolicy.decide on a memory-mapped policy file (batches of 100000 states).
+    """
+    batches = 10 if quick else 100
+    rng = np.random.default_rng(0)
+    states = np.stack([rng.integers(4, 22, 100000), rng.integers(2, 12, 100000), rng.integers(0, 2, 100000)], axis=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'policy.npy')
+        serving.compile_policy(solver.solve().policy).save(path)
+        policy = serving.CompiledPolicy.load(path)
+        def run():
+            for _ in range(batches):
+                policy.decide(states)
+        result = _rate(batches * len(states), 'states/s', run, repeats)
+        del policy # release the memory map before the directory is removed
+    return result
+
+def _trained_snapshots(count):
+    return q_agent.train(episodes=2500 * count, seed=0)[6:8]
+
+def bench_q_to_grids(quick, repeats):
+    """
+    Latency of q_to_grids on a trained QTable.
+    """
+    checkpoint_Qs, _ = _trained_snapshots(1)
+    Q = checkpoint_Qs[-1] # rebuilt from the delta log once, outside the timing
+    calls = 100
+    def run():
+        for _ in range(calls):
+            q_agent.q_to_grids(Q)
+    result = _latency(run, repeats)
+    result['value'] /= calls
+    return result
+
+def bench_plot_evolution(quick, repeats):
+    """
+    Latency of rendering the evolution snapshots and GIFs (headless, in this process).
+    """
+    checkpoint_Qs, checkpoint_episodes = _trained_snapshots(2 if quick else 6)
+    stack = q_agent.q_to_grid_stack(checkpoint_Qs)
+    from .visualization import render
+    def run():
+        with tempfile.TemporaryDirectory() as output_dir:
+            render.render_evolution(stack, checkpoint_episodes, output_dir, workers=1, save_snaps=False, dpi=50)
+    return _latency(run, repeats)
+
+# benchmark cases by name, in the order they run
+CASES = {
+    'env_step': bench_env_step,
+    'batch_env_step': bench_batch_env_step,
+    'hand_value': bench_hand_value,
+    'train': bench_train,
+    'train_batched': bench_train_batched,
+    'check_accuracy': bench_check_accuracy,
+    'evaluate_policy': bench_evaluate_policy,
+    'policy_kernel': bench_policy_kernel,
+    'policy_lookup': bench_policy_lookup,
+    'q_to_grids': bench_q_to_grids,
+    'plot_evolution': bench_plot_evolution,
+}
+
+def run_benchmarks(names=None, quick=False, repeats=3):
+    """
+    Runs the benchmark cases. Every case is seeded, so each run does exactly the same work.
+
+    Args:
+        names: optional list of case names (see CASES), all of them by default.
+        quick: whether to run smaller versions of the cases.
+        repeats: number of times each case is timed (the best time is reported).
+    Returns: dictionary with the machine details ('meta') and a result per case ('cases'): its value, unit,
+        whether higher is better and all measured times.
+    """
+    names = list(CASES) if names is None else names
+    results = {}
+    for name in names:
+        results[name] = CASES[name](quick, repeats)
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'policy_kernel_backend': policy_kernel.available_backends()[0],
+            'platform': platform.platform(),
+            'host': platform.node(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'quick': quick,
+            'repeats': repeats,
+        },
+        'cases': results,
+    }
+
+def _setup(meta):
+    # what has to match for timings to be comparable: the machine and the size of the cases
+    return {key: meta.get(key) for key in ('host', 'machine', 'cpus', 'quick')}
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compares benchmark results against a baseline run. Timings are only comparable on the same machine
+    with the same case sizes, so a baseline from another host, CPU count or --quick setting is refused.
+
+    Args:
+        results: output of run_benchmarks.
+        baseline: output of an earlier run_benchmarks (e.g. loaded from its JSON file).
+        threshold: allowed relative slowdown before a case counts as a regression (0.1 = 10%).
+    Returns: dictionary mapping each case in both runs to its baseline value, new value, speedup
+        (above 1 is faster) and whether it regressed.
+    Raises: ValueError if the baseline was recorded on a different setup.
+    """
+    ours, theirs = _setup(results['meta']), _setup(baseline['meta'])
+    if ours != theirs:
+        differences = ', '.join(f"{key} {theirs[key]!r} vs {ours[key]!r}" for key in ours if ours[key] != theirs[key])
+        raise ValueError(f"The baseline was recorded on a different setup ({differences}); "
+                         "record a new one with --update")
+    comparison = {}
+    for name, result in results['cases'].items():
+        if name not in baseline['cases']:
+            continue
+        old = baseline['cases'][name]['value']
+        new = result['value']
+        speedup = new / old if result['higher_is_better'] else old / new
+        comparison[name] = {'baseline': old, 'value': new, 'speedup': speedup, 'regressed': speedup < 1 - threshold}
+    return comparison
+
+def update_baseline(results, path):
+    """
+    Writes benchmark results into a baseline file. Cases already in the file are kept when it was recorded on
+    the same setup (so a few cases can be re-recorded); otherwise the file is replaced.
+    """
+    baseline = None
+    if os.path.exists(path):
+        with open(path) as f:
+            baseline = json.load(f)
+        if _setup(baseline['meta']) != _setup(results['meta']):
+            baseline = None
+    cases = dict(baseline['cases']) if baseline is not None else {}
+    cases.update(results['cases'])
+    with open(path, 'w') as f:
+        f.write(json.dumps({'meta': results['meta'], 'cases': cases}, indent=2, default=float) + '\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs the blackjack-rl benchmarks and writes the results as JSON.')
+    parser.add_argument('cases', nargs='*', help=f"cases to run (default: all): {', '.join(CASES)}")
+    parser.add_argument('--quick', action='store_true', help='run smaller versions of the cases')
+    parser.add_argument('--repeats', type=int, default=3, help='times each case is timed')
+    parser.add_argument('--output', help='file to write the JSON results to (default: print them)')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed relative slowdown (default: 0.1)')
+    parser.add_argument('--update', action='store_true',
+                        help='record the results as the baseline (--baseline, default benchmark_baseline.json) '
+                             'instead of comparing against it')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.cases or None, args.quick, args.repeats)
+    if args.update:
+        update_baseline(results, args.baseline or 'benchmark_baseline.json')
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        try:
+            results['comparison'] = compare(results, baseline, args.threshold)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+    text = json.dumps(results, indent=2, default=float)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    regressed = [name for name, entry in results.get('comparison', {}).items() if entry['regressed']]
+    for name in regressed:
+        print(f"Regression in {name}: {results['comparison'][name]['speedup']:.2f}x the baseline speed", file=sys.stderr)
+    return 1 if regressed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import json
+import os
+import numpy as np
+from .agents import q_table
+
+def _q_table_arrays(Q):
+    return {
+        'q_values': Q.values,
+        'visits': Q.visits,
+        'seen': Q.seen,
+        'actions': np.array(Q.actions),
+        'initial_value': np.array(Q.initial_value),
+        'count_buckets': np.array(getattr(Q, 'count_buckets', -1)),
+        'remaining_buckets': np.array(getattr(Q, 'remaining_buckets', None) or -1),
+    }
+
+def _save_arrays(path, arrays):
+    # written to a temporary name first and then renamed, so a crash never leaves a broken file behind
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def save_q_table(path, Q):
+    """
+    Saves only a Q-table (QTable or CountQTable) to a .npz file that load_q_table can read.
+    """
+    _save_arrays(path, _q_table_arrays(Q))
+
+def save_checkpoint(path, Q, episode, epsilon, accuracies, checkpoint_Qs=(), checkpoint_episodes=(),
+                    environment=None, counters=None, config=None, rng_states=None):
+    """
+    Saves the training state to a single .npz file. The file is written to a temporary name first
+    and then renamed, so a crash while saving never leaves a broken checkpoint behind.
+
+    Args:
+        path: path of the checkpoint file (.npz).
+        Q: QTable being trained.
+        episode: number of episodes finished (training resumes at this episode index).
+        epsilon: current exploration rate.
+        accuracies: list of accuracy measurements so far.
+        checkpoint_Qs: QTable snapshots taken so far.
+        checkpoint_episodes: episode numbers of the snapshots.
+        environment: optional BlackjackEnviron, to save its shoe and bankroll.
+        counters: optional dictionary of integer/float training counters (wins, returns, ...).
+        config: optional dictionary of training arguments, saved for reference.
+        rng_states: optional dictionary of named numpy Generator states (bit_generator.state) to resume the random streams from.
+            The environment's shuffling generator is saved with the environment.
+    """
+    arrays = _q_table_arrays(Q)
+    arrays.update({
+        'episode': np.array(episode),
+        'epsilon': np.array(epsilon),
+        'accuracies': np.array(accuracies, dtype=float),
+        'checkpoint_values': np.array([snap.values for snap in checkpoint_Qs]),
+        'checkpoint_visits': np.array([snap.visits for snap in checkpoint_Qs]),
+        'checkpoint_seen': np.array([snap.seen for snap in checkpoint_Qs]),
+        'checkpoint_episodes': np.array(checkpoint_episodes, dtype=np.int64),
+        'counters': np.array(json.dumps(counters or {})),
+        'config': np.array(json.dumps(config or {})),
+        'rng_states': np.array(json.dumps(rng_states or {})),
+    })
+    if environment is not None:
+        arrays['deck'] = np.array(environment.deck, dtype=np.int8)
+        # the next reshuffle starts from the order of the reusable shoe buffer
+        arrays['shoe_buffer'] = np.array(environment._shoe_buffer, dtype=np.int8)
+        arrays['bankroll'] = np.array(environment.bankroll)
+        arrays['running_count'] = np.array(environment.running_count)
+        arrays['environment_rng'] = np.array(json.dumps(environment.rng.bit_generator.state))
+    _save_arrays(path, arrays)
+
+def _to_qtable(actions, initial_value, count_buckets, remaining_buckets, values, visits, seen):
+    if count_buckets < 0:
+        Q = q_table.QTable(actions, initial_value)
+    else:
+        Q = q_table.CountQTable(actions, initial_value, count_buckets, remaining_buckets if remaining_buckets > 0 else None)
+    Q.values[:] = values
+    Q.visits[:] = visits
+    Q.seen[:] = seen
+    return Q
+
+def load_checkpoint(path):
+    """
+    Loads a checkpoint saved by save_checkpoint.
+    Returns: dictionary with the QTable ('Q'), 'episode', 'epsilon', 'accuracies', 'checkpoint_Qs',
+        'checkpoint_episodes', 'counters', 'config', 'rng_states' (including the environment's as 'environment', if saved),
+        and the raw arrays ('data', for the shoe).
+    """
+    with np.load(path) as f:
+        data = {key: f[key] for key in f.files}
+    actions = data['actions'].tolist()
+    # (count_buckets, remaining_buckets) of a CountQTable, -1 if unused
+    layout = (int(data['count_buckets']), int(data['remaining_buckets']))
+    initial_value = float(data['initial_value'])
+    rng_states = json.loads(str(data['rng_states'])) if 'rng_states' in data else {}
+    if 'environment_rng' in data:
+        rng_states['environment'] = json.loads(str(data['environment_rng']))
+    return {
+        'Q': _to_qtable(actions, initial_value, *layout, data['q_values'], data['visits'], data['seen']),
+        'episode': int(data['episode']),
+        'epsilon': float(data['epsilon']),
+        'accuracies': data['accuracies'].tolist(),
+        'checkpoint_Qs': [_to_qtable(actions, initial_value, *layout, *snap) for snap in
+                          zip(data['checkpoint_values'], data['checkpoint_visits'], data['checkpoint_seen'])],
+        'checkpoint_episodes': data['checkpoint_episodes'].tolist(),
+        'counters': json.loads(str(data['counters'])),
+        'config': json.loads(str(data['config'])),
+        'rng_states': rng_states,
+        'data': data,
+    }
+
+def load_q_table(path):
+    """
+    Loads only the Q-table from a checkpoint or a file saved by save_q_table.
+    Returns: QTable (or CountQTable).
+    """
+    with np.load(path) as f:
+        return _to_qtable(f['actions'].tolist(), float(f['initial_value']), int(f['count_buckets']),
+                          int(f['remaining_buckets']), f['q_values'], f['visits'], f['seen'])
@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import sys
+from . import checkpoint
+from . import serving
+from . import train_log
+from .agents import learners
+from .agents import q_table
+from .agents.convergence import ConvergenceTracker
+from .agents.q_agent import basic_strategy_policy, eval, policy_agreement, q_to_grids, train, train_learner
+from .evaluation import policy_kernel
+
+def main():
+    """
+    Main function to train and evaluate the Q-learning agent playing Blackjack.
+    """
+    from .visualization.plots import eval_accuracy, plot_policy_and_agreement, plot_evolution
+    alpha = 0.08 # learning rate
+    gamma = 0.95 # discount factor
+    epsilon = 1.0 # exploration rate (decays over time)
+    episodes = 50000 # number of training episodes
+    bankroll = 100  # initial bankroll for betting
+    Q, state_visits, diffs, win_amt, total_return, accuracies, checkpoint_Qs, checkpoint_episodes = train(alpha, gamma, epsilon, episodes, bankroll)
+    #understanding_q(Q, state_visits)
+    eval(win_amt, total_return, episodes)
+    eval_accuracy(accuracies, episodes=2500, save=True)
+    plot_policy_and_agreement(Q, title_suffix='final', savepath='policy_final.png')
+    plot_evolution(checkpoint_Qs, checkpoint_episodes, ncols=3, save_prefix='policy_evo')
+
+def _headless():
+    # selects the non-interactive backend before pyplot is first imported, so no window or display is needed
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _print_json(record):
+    print(json.dumps(record, indent=2, default=float))
+
+def _load_q(source):
+    # a run directory written by train (see train_log) or a .npz file with a Q-table
+    if os.path.isdir(source):
+        result = train_log.TrainResult(source)
+        if result.Q is None:
+            raise SystemExit(f"No Q-table in {source}")
+        return result.Q, result
+    return checkpoint.load_q_table(source), None
+
+def _policy_grid(source):
+    # policy array for eval: 'basic' (basic_strategy_policy), 'optimal' (the exact solver) or a saved Q-table
+    if source == 'basic':
+        return basic_strategy_policy()
+    if source == 'optimal':
+        from .solvers import solver
+        return solver.solve().policy
+    if source.endswith('.npy'):
+        return serving.CompiledPolicy.load(source).grid
+    return _load_q(source)[0]
+
+def _alpha(text):
+    # learning rate, or 'none' for sample averages (monte_carlo only)
+    return None if text.lower() == 'none' else float(text)
+
+def _cli_train(args):
+    config = {'alpha': args.alpha, 'gamma': args.gamma, 'epsilon': args.epsilon, 'episodes': args.episodes}
+    tracker = None
+    if args.converge_window:
+        tracker = ConvergenceTracker(window=args.converge_window, max_flips=args.max_flips)
+    if args.learner == 'q_learning' and args.num_envs is None:
+        result = train(bankroll=args.bankroll, seed=args.seed, log_dir=args.output_dir, tracker=tracker, **config)
+        Q, _, _, win_amt, total_return, accuracies, checkpoint_Qs, checkpoint_episodes = result
+        # train() stops right after the checkpoint it converged at
+        played = checkpoint_episodes[-1] if tracker is not None and tracker.converged else args.episodes
+    else:
+        Q, _, _, win_amt, total_return, accuracies, checkpoint_Qs, checkpoint_episodes, played = train_learner(
+            args.learner, num_envs=args.num_envs, seed=args.seed, tracker=tracker, **config)
+        if args.output_dir:
+            # the same files train() streams, so plot and eval read every run the same way
+            log = train_log.TrainLog(args.output_dir)
+            log.start(0, dict(config, learner=args.learner, num_envs=args.num_envs))
+            for episode, snapshot, accuracy in zip(checkpoint_episodes, checkpoint_Qs, accuracies):
+                log.snapshot(episode, snapshot, accuracy)
+            log.episodes(played, played, win_amt, total_return, args.epsilon, 0)
+            log.finish(played, Q)
+    agreement = policy_agreement(q_to_grids(Q))
+    converged = tracker is not None and tracker.converged
+    _print_json({
+        'episodes': played,
+        'win_rate': win_amt / played,
+        'avg_return': total_return / played,
+        'final_accuracy': accuracies[-1] if accuracies else None,
+        'agreement_hard': agreement['agreement_hard'],
+        'agreement_soft': agreement['agreement_soft'],
+        'converged': converged if tracker is not None else None,
+        'output_dir': args.output_dir,
+    })
+    if args.plot:
+        _plot_run(Q, accuracies, checkpoint_Qs, checkpoint_episodes, args.output_dir or '.', args.show, args.workers)
+
+def _plot_run(Q, accuracies, checkpoint_Qs, checkpoint_episodes, output_dir, show, workers=None):
+    if not show:
+        _headless()
+    from .visualization.plots import eval_accuracy, plot_policy_and_agreement, plot_evolution
+    os.makedirs(output_dir, exist_ok=True)
+    if accuracies:
+        eval_accuracy(accuracies, episodes=2500, save=True, savepath=os.path.join(output_dir, 'accuracy.png'), show=show)
+    plot_policy_and_agreement(Q, title_suffix='final', savepath=os.path.join(output_dir, 'policy_final.png'), show=show)
+    if len(checkpoint_Qs):
+        plot_evolution(checkpoint_Qs, checkpoint_episodes, ncols=3, save_prefix='policy_evo', workers=workers, show=show,
+                       output_dir=output_dir)
+
+def _cli_eval(args):
+    policy = _policy_grid(args.source)
+    result = policy_kernel.evaluate_hands(policy, args.hands, seed=args.seed, backend=args.backend)
+    if isinstance(policy, q_table.QTable):
+        agreement = policy_agreement(q_to_grids(policy))
+        result.update(agreement_hard=agreement['agreement_hard'], agreement_soft=agreement['agreement_soft'])
+    _print_json(dict(result, source=args.source))
+
+def _cli_plot(args):
+    Q, result = _load_q(args.source)
+    if result is not None:
+        _plot_run(Q, result.accuracies, result.checkpoint_Qs, result.checkpoint_episodes, args.output_dir, args.show,
+                  args.workers)
+    else:
+        _plot_run(Q, [], [], [], args.output_dir, args.show, args.workers)
+
+def _cli_export(args):
+    policy = serving.compile_policy(_policy_grid(args.source), fallback=args.fallback)
+    policy.save(args.output)
+    _print_json({'source': args.source, 'output': args.output, 'hit_states': int((policy.grid[4:22, 2:12] == 0).sum())})
+
+def _cli_serve(args):
+    print(f"Serving {args.policy} on http://{args.host}:{args.port} (POST /decide)", flush=True)
+    serving.serve(args.policy, args.host, args.port, args.max_batch, args.max_delay)
+
+def cli(argv=None):
+    """
+    Command-line entry point: blackjack-rl (or python -m blackjack_rl, or python q-agent.py) {train,eval,plot,export,serve,bench} [options].
+    Plotting libraries are only imported when a plot is made, and plots are saved headless unless --show is
+    given, so short batch jobs start quickly and never wait on a window. Without a subcommand, main() runs as before.
+
+    Args:
+        argv: list of command-line arguments (default: sys.argv[1:]).
+    Returns: exit status.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        main()
+        return 0
+
+    parser = argparse.ArgumentParser(prog='blackjack-rl', description='Trains, evaluates and plots the blackjack agents.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = commands.add_parser('train', help='train an agent')
+    train_parser.add_argument('--episodes', type=int, default=50000, help='number of training episodes')
+    train_parser.add_argument('--alpha', type=_alpha, default=0.08,
+                              help="learning rate, or 'none' for sample averages with --learner monte_carlo")
+    train_parser.add_argument('--gamma', type=float, default=0.95, help='discount factor')
+    train_parser.add_argument('--epsilon', type=float, default=1.0, help='initial exploration rate')
+    train_parser.add_argument('--bankroll', type=float, default=100, help='initial bankroll (scalar Q-learning only)')
+    train_parser.add_argument('--seed', type=int, help='seed of the run')
+    train_parser.add_argument('--learner', default='q_learning', choices=list(learners.LEARNERS), help='learner to train')
+    train_parser.add_argument('--num-envs', type=int, help='train on this many tables at once (default: one table)')
+    train_parser.add_argument('--output-dir', help='directory to write the run to (events, snapshots, final Q-table)')
+    train_parser.add_argument('--converge-window', type=int,
+                              help='stop once the policy has been stable for this many checkpoints in a row')
+    train_parser.add_argument('--max-flips', type=int, default=2,
+                              help='most greedy actions that can change at a stable checkpoint (with --converge-window)')
+    train_parser.add_argument('--plot', action='store_true', help='save the accuracy, policy and evolution plots')
+    train_parser.add_argument('--show', action='store_true', help='also show the plots in windows')
+    train_parser.add_argument('--workers', type=int, help='processes for rendering the evolution snapshots')
+
+    eval_parser = commands.add_parser('eval', help='evaluate a policy')
+    eval_parser.add_argument('source', help="run directory, .npz Q-table, 'basic' or 'optimal'")
+    eval_parser.add_argument('--hands', type=int, default=1000000, help='number of hands to play')
+    eval_parser.add_argument('--seed', type=int, help='seed of the shoes')
+    eval_parser.add_argument('--backend', default='auto', choices=['auto', 'numba', 'numpy'], help='evaluation backend')
+
+    plot_parser = commands.add_parser('plot', help='plot a trained run')
+    plot_parser.add_argument('source', help='run directory or .npz Q-table')
+    plot_parser.add_argument('--output-dir', default='.', help='directory to save the plots to')
+    plot_parser.add_argument('--show', action='store_true', help='also show the plots in windows')
+    plot_parser.add_argument('--workers', type=int, help='processes for rendering the evolution snapshots')
+
+    export_parser = commands.add_parser('export', help='compile a policy to a lookup table for serving')
+    export_parser.add_argument('source', help="run directory, .npz Q-table, 'basic' or 'optimal'")
+    export_parser.add_argument('output', help='path of the compiled policy (.npy)')
+    export_parser.add_argument('--fallback', default='basic', choices=['basic', 'hit', 'stand'],
+                               help='action for states the policy has not seen')
+
+    serve_parser = commands.add_parser('serve', help='serve a compiled policy over HTTP')
+    serve_parser.add_argument('policy', help='compiled policy (.npy) written by export')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    serve_parser.add_argument('--port', type=int, default=8000, help='port to listen on')
+    serve_parser.add_argument('--max-batch', type=int, default=65536, help='most states looked up in one batch')
+    serve_parser.add_argument('--max-delay', type=float, default=0.001,
+                              help='longest time in seconds a request waits for others to join its batch')
+
+    commands.add_parser('bench', help='run the benchmarks (arguments go to benchmarks.py)', add_help=False)
+
+    if argv[0] == 'bench':
+        from . import benchmarks
+        return benchmarks.main(argv[1:])
+    args = parser.parse_args(argv)
+    if args.command == 'train' and args.alpha is None and args.learner != 'monte_carlo':
+        parser.error("--alpha none (sample averages) needs --learner monte_carlo")
+    handlers = {'train': _cli_train, 'eval': _cli_eval, 'plot': _cli_plot, 'export': _cli_export, 'serve': _cli_serve}
+    handlers[args.command](args)
+    return 0
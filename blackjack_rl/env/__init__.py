@@ -0,0 +1,6 @@
+"""
+Blackjack environments: the scalar and batched tables, their rules and the shoe sources.
+"""
+from .blackjack_environ import (ACTION_NAMES, DOUBLE, HIT, INSURANCE, SPLIT, STAND, SURRENDER, BatchBlackjackEnviron,
+                                BlackjackEnviron, TableRules)
+from .shoe import RecordedShoes, ShoeStream, record_shoes
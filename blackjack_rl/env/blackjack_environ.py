@@ -0,0 +1,834 @@
+import numpy as np
+
+# Integer card encoding: card = suit index * 13 + rank index (rank index 0-12 is '2'..'A')
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+SUITS = ['Clubs', 'Diamonds', 'Hearts', 'Spades']
+ACE = 12 # rank index of the ace
+# hard value of each card 0-51, counting aces as 1
+CARD_VALUES = np.array([2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 1] * 4, dtype=np.int64)
+CARD_IS_ACE = np.array([0] * 12 + [1], dtype=np.int64)[np.arange(52) % 13]
+# Hi-Lo card counting tags: +1 for 2-6, 0 for 7-9, -1 for tens and aces
+HI_LO = np.array([1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1, -1] * 4, dtype=np.int64)
+# action codes; BlackjackEnviron.actions lists the names of the ones a table allows, in this order
+HIT = 0
+STAND = 1
+DOUBLE = 2
+SPLIT = 3
+SURRENDER = 4
+INSURANCE = 5
+ACTION_NAMES = ['hit', 'stand', 'double', 'split', 'surrender', 'insurance']
+_ACTION_CODES = {name: code for code, name in enumerate(ACTION_NAMES)}
+
+# plain-list copies of the tables for the scalar environment (faster to index than numpy arrays)
+_VALUES = CARD_VALUES.tolist()
+_IS_ACE = CARD_IS_ACE.tolist()
+_UPCARD_VALUES = [11 if value == 1 else value for value in _VALUES]
+_HI_LO = HI_LO.tolist()
+_RANK_VALUES = {rank: value for rank, value in zip(RANKS, _VALUES)}
+
+def _check_shoe_source(shoe_source, num_decks):
+    if shoe_source is not None and shoe_source.shoe_size != 52 * num_decks:
+        raise ValueError(f"Shoe source deals {shoe_source.shoe_size}-card shoes, expected {52 * num_decks}")
+    return shoe_source
+
+class TableRules:
+    def __init__(self, dealer_hits_soft17=True, blackjack_payout=1.5, double=False, double_after_split=True,
+                 max_splits=0, resplit_aces=False, hit_split_aces=False, surrender=False, insurance=False,
+                 dealer_peek=False):
+        """
+        Table rules of a Blackjack environment. The defaults are the original hit/stand game;
+        TableRules.casino() enables the full action set.
+
+        Args:
+            dealer_hits_soft17: H17 (dealer hits 17 while holding an ace) if True, S17 (dealer stands on all 17s) if False.
+            blackjack_payout: payout of a player blackjack per unit bet (1.5 for 3:2, 1.2 for 6:5).
+            double: whether the player may double down on any first two cards.
+            double_after_split: whether doubling is allowed on split hands (DAS).
+            max_splits: maximum number of splits per round (0 disables splitting, 3 allows up to 4 hands).
+            resplit_aces: whether a hand from split aces may be split again.
+            hit_split_aces: whether hands from split aces may take more cards (otherwise they get one card each).
+            surrender: whether late surrender is offered (half the bet back, unless the dealer has blackjack).
+            insurance: whether insurance (a side bet of half the bet, paying 2:1 on a dealer blackjack) is offered against an ace.
+            dealer_peek: whether the dealer checks for blackjack before the player acts (US rules), so a dealer
+                blackjack only takes the original bet and a player 21 cannot push against it. Without it (the
+                European no-hole-card game, ENHC), every hand is settled against the dealer's final hand: doubled
+                and split bets are lost in full to a dealer blackjack, and so is a surrendered bet.
+        """
+        self.dealer_hits_soft17 = dealer_hits_soft17
+        self.blackjack_payout = blackjack_payout
+        self.double = double
+        self.double_after_split = double_after_split
+        self.max_splits = max_splits
+        self.resplit_aces = resplit_aces
+        self.hit_split_aces = hit_split_aces
+        self.surrender = surrender
+        self.insurance = insurance
+        self.dealer_peek = dealer_peek
+
+    @classmethod
+    def casino(cls, **overrides):
+        """
+        Common casino rules: H17, 3:2, the dealer peeks for blackjack, double on any two cards, DAS, split up to
+        4 hands, one card to split aces, late surrender and insurance. Keyword arguments override single rules.
+        """
+        rules = dict(double=True, max_splits=3, surrender=True, insurance=True, dealer_peek=True)
+        rules.update(overrides)
+        return cls(**rules)
+
+    def action_names(self):
+        """
+        Returns: names of the actions these rules allow, in action code order.
+        """
+        allowed = [True, True, self.double, self.max_splits > 0, self.surrender, self.insurance]
+        return [name for name, ok in zip(ACTION_NAMES, allowed) if ok]
+
+def card_to_tuple(card):
+    """
+    Converts an integer card (0-51) to the (rank, suit) tuple format.
+    """
+    return (RANKS[card % 13], SUITS[card // 13])
+
+def hand_to_tuples(hand):
+    """
+    Converts a hand of integer cards to a list of (rank, suit) tuples.
+    """
+    return [card_to_tuple(card) for card in hand]
+
+class BlackjackEnviron:
+    def __init__(self, start_bankroll = 100, num_decks=6, num_when_to_shuffle=75, shoe_source=None,
+                 count_buckets=None, remaining_buckets=None, rules=None, seed=None):
+        """
+        Initializes the Blackjack environment (creates deck, starts game).
+        Cards are held as integers (see card_to_tuple for the (rank, suit) format).
+        
+        Args:
+            start_bankroll: Beginning amount of money/chips to work with.
+            num_decks: Number of decks to use in the shoe.
+            num_when_to_shuffle: Number of cards to deal before shuffling.
+            shoe_source: Optional source of pre-shuffled shoes (shoe.ShoeStream or shoe.RecordedShoes).
+                By default one reusable shoe is reshuffled in place with the environment's generator.
+            count_buckets: Optional limit k to add the Hi-Lo true count to the state, rounded and clipped to [-k, k].
+            remaining_buckets: Optional number of buckets to also add how much of the shoe is left to the state
+                (requires count_buckets).
+            rules: Optional TableRules (default: the hit/stand game, H17 with 3:2 blackjacks).
+            seed: Seed (or numpy Generator) for shuffling the shoe.
+        """
+        self.rules = rules if rules is not None else TableRules()
+        self.num_decks = num_decks
+        self.num_when_to_shuffle = num_when_to_shuffle
+        self.shoe_source = _check_shoe_source(shoe_source, num_decks)
+        self.rng = np.random.default_rng(seed)
+        self._shoe_buffer = np.tile(np.arange(52, dtype=np.int8), num_decks)
+        self.count_buckets = count_buckets
+        self.remaining_buckets = remaining_buckets
+        if remaining_buckets is not None and count_buckets is None:
+            raise ValueError("remaining_buckets requires count_buckets")
+        self.running_count = 0 # Hi-Lo running count of the cards dealt from the current shoe
+        self.player_hand = []
+        self.dealer_hand = []
+        # running (hard total with aces as 1, ace count) of each hand
+        self.player_hard = 0
+        self.player_aces = 0
+        self.dealer_hard = 0
+        self.dealer_aces = 0
+        self.bankroll = start_bankroll
+        self.current_bet = 0 # bet of each hand (a doubled hand bets twice this)
+        self.actions = self.rules.action_names()
+        # split hands: cards waiting to start their own hand (last in, first out),
+        # and (cards, hard total, ace count, bet, from split) of the hands already played this round
+        self.split_cards = []
+        self.finished_hands = []
+        self.split_count = 0
+        self.from_split = False # whether the current hand came from a split
+        self.doubled = False
+        self.insurance_bet = 0
+        self.game_over = False
+        self.deck = self.create_deck()
+        self.start_game()
+
+    def place_bet(self, bet):
+        """
+        Places bet for the current round. Minimum bet is 1.
+        
+        Args:
+            bet: Bet amount to place.
+        """
+        if bet < 1: # betting minimum of 1
+            raise ValueError("Minimum bet is 1")
+        if bet > self.bankroll:
+            raise ValueError("Not enough chips")
+        self.current_bet = bet
+        self.bankroll -= bet
+
+    def create_deck(self):
+        """
+        Creates and shuffles a shoe of cards based on the number of decks of the Blackjack instance.
+        Takes the next shoe from the shoe source if there is one, otherwise reshuffles the reusable shoe buffer in place.
+        Cards are dealt from the end of the list, so a source's shoe is reversed to deal it from its first card,
+        in the same order as BatchBlackjackEnviron.
+        """
+        if self.shoe_source is not None:
+            return self.shoe_source.next_shoe()[::-1]
+        self.rng.shuffle(self._shoe_buffer)
+        return self._shoe_buffer.tolist()
+
+    def needs_shuffle(self):
+        """
+        Checks if the deck needs to be shuffled based on the number of remaining cards,
+        and the threshold set for shuffling.
+        """
+        return len(self.deck) <= self.num_when_to_shuffle
+
+    def deal_card(self):
+        """
+        Picks the top card from the deck, shuffling if necessary.
+        Returns: the selected card as an integer (0-51).
+        """
+        if len(self.deck) <= self.num_when_to_shuffle:
+            self.deck = self.create_deck()
+            self.running_count = 0
+        card = self.deck.pop()
+        self.running_count += _HI_LO[card]
+        return card
+
+    def _deal_player(self):
+        card = self.deal_card()
+        self.player_hand.append(card)
+        self.player_hard += _VALUES[card]
+        self.player_aces += _IS_ACE[card]
+
+    def _deal_dealer(self):
+        card = self.deal_card()
+        self.dealer_hand.append(card)
+        self.dealer_hard += _VALUES[card]
+        self.dealer_aces += _IS_ACE[card]
+
+    def start_game(self):
+        """
+        Starts a new round of Blackjack, dealing two cards each to player and dealer.
+        Returns: the initial state (player total, dealer upcard, usable ace).
+        """
+        self.game_over = False
+        self.player_hand = []
+        self.dealer_hand = []
+        self.player_hard = self.player_aces = 0
+        self.dealer_hard = self.dealer_aces = 0
+        if self.split_count or self.doubled or self.insurance_bet:
+            self.finished_hands = []
+            self.split_count = 0
+            self.from_split = self.doubled = False
+            self.insurance_bet = 0
+        self._deal_player()
+        self._deal_player()
+        self._deal_dealer()
+        self._deal_dealer()
+        return self._get_state()
+
+    def _get_state(self):
+        """
+        Gets the current state of the game.
+        Returns: the current state as a tuple: (player total, dealer upcard value, usable ace),
+            followed by the true count bucket (and shoe remaining bucket) if enabled.
+        """
+        hard = self.player_hard
+        usable_ace = self.player_aces > 0 and hard <= 11
+        state = (hard + 10 if usable_ace else hard, _UPCARD_VALUES[self.dealer_hand[0]], usable_ace)
+        if self.count_buckets is None:
+            return state
+        state += (self.true_count_bucket(),)
+        if self.remaining_buckets is not None:
+            remaining = len(self.deck) * self.remaining_buckets // (52 * self.num_decks)
+            state += (min(remaining, self.remaining_buckets - 1),)
+        return state
+
+    def visible_count(self):
+        """
+        Gets the Hi-Lo running count of the cards the player has seen (the dealer's hole card only counts once the round is over).
+        """
+        if not self.game_over and len(self.dealer_hand) > 1:
+            return self.running_count - _HI_LO[self.dealer_hand[1]]
+        return self.running_count
+
+    def true_count_bucket(self):
+        """
+        Gets the true count (running count per deck left in the shoe), rounded and clipped to [-count_buckets, count_buckets].
+        """
+        decks_left = max(len(self.deck), 1) / 52
+        true_count = round(self.visible_count() / decks_left)
+        return max(-self.count_buckets, min(self.count_buckets, true_count))
+
+    @staticmethod
+    def hand_value(hard, aces):
+        """
+        Calculates hand value from a running hard total (aces as 1) and ace count.
+        Counts one ace as 11 if that does not bust.
+        Returns: total value of the hand, whether a usable ace is present.
+        """
+        if aces and hard <= 11:
+            return hard + 10, True
+        return hard, False
+
+    def calculate_hand_value(self, hand):
+        """
+        Calculates hand value, accounting for aces.
+        Adjusts ace value from 11 to 1 if busting.
+        Args: 
+            hand: list of integer cards, or of tuples representing the hand (rank, suit).
+        Returns: total value of the hand, whether a usable ace is present.
+        """
+        hard = 0
+        aces = 0
+        for card in hand:
+            if isinstance(card, tuple):
+                rank = card[0]
+                hard += _RANK_VALUES[rank]
+                aces += rank == 'A'
+            else:
+                hard += _VALUES[card]
+                aces += _IS_ACE[card]
+        return self.hand_value(hard, aces)
+
+    def player_hit(self):
+        """
+        Player takes a hit (draws a card). Updates game over status if bust.
+        """
+        if not self.game_over:
+            self._deal_player()
+            if self.player_hard > 21:
+                self.game_over = True
+
+    def dealer_play(self):
+      """
+      Dealer plays according to standard rules: hits until reaching 17 or higher.
+      Hits on 17 while holding an ace, unless the table stands on soft 17.
+      """
+      while True:
+          value = self.hand_value(self.dealer_hard, self.dealer_aces)[0]
+          if value < 17 or (value == 17 and self.dealer_aces and self.rules.dealer_hits_soft17):
+              self._deal_dealer()
+          else:
+              break
+
+    def dealer_blackjack(self):
+        """
+        Checks whether the dealer's first two cards are a blackjack.
+        """
+        return len(self.dealer_hand) == 2 and self.hand_value(self.dealer_hard, self.dealer_aces)[0] == 21
+
+    def _outcome(self, hard, aces, num_cards, bet, from_split):
+        player_value = self.hand_value(hard, aces)[0]
+        dealer_value = self.hand_value(self.dealer_hard, self.dealer_aces)[0]
+
+        # a 21 on two cards after a split is not a blackjack
+        player_blackjack = (num_cards == 2 and player_value == 21 and not from_split)
+        dealer_blackjack = (len(self.dealer_hand) == 2 and dealer_value == 21)
+
+        if player_blackjack and dealer_blackjack:
+            return "It's a tie with blackjacks! (Push)", 0
+        elif player_blackjack:
+            payout = self.rules.blackjack_payout
+            return f"Player wins with a blackjack! (Payout {payout} bet)", payout * bet
+        elif dealer_blackjack and self.rules.dealer_peek:
+            # the dealer checked before the player acted, so the round never got to a player 21
+            return "Dealer wins with a blackjack! (Dealer takes bet)", -bet
+        elif player_value == dealer_value:
+            return "It's a tie! (Push)", 0
+        elif dealer_blackjack:
+            return "Dealer wins with a blackjack! (Dealer takes bet)", -bet
+        if player_value > 21:
+            return "Dealer wins!", -bet
+        elif dealer_value > 21 or player_value > dealer_value:
+            return "Player wins!", bet
+        elif player_value < dealer_value:
+            return "Dealer wins!", -bet
+
+    def check_winner(self):
+        """
+        Determines the winner of the round (the current hand) and calculates amount won/lost.
+        Returns: outcome message, payout amount.
+        """
+        bet = 2 * self.current_bet if self.doubled else self.current_bet
+        return self._outcome(self.player_hard, self.player_aces, len(self.player_hand), bet, self.from_split)
+
+    def legal_actions(self):
+        """
+        Gets the actions allowed in the current hand under the table rules.
+        Surrender and insurance are only offered on the first two cards, before any split.
+        Returns: list of action codes (HIT, STAND, DOUBLE, SPLIT, SURRENDER, INSURANCE).
+        """
+        if self.game_over:
+            return []
+        rules = self.rules
+        hand = self.player_hand
+        split_aces = self.from_split and _IS_ACE[hand[0]]
+        no_hit = split_aces and not rules.hit_split_aces
+        legal = [STAND] if no_hit else [HIT, STAND]
+        if len(hand) == 2:
+            if rules.double and not no_hit and (rules.double_after_split or not self.from_split):
+                legal.append(DOUBLE)
+            if (self.split_count < rules.max_splits and _VALUES[hand[0]] == _VALUES[hand[1]]
+                    and (rules.resplit_aces or not split_aces)):
+                legal.append(SPLIT)
+            if not self.split_count:
+                if rules.surrender:
+                    legal.append(SURRENDER)
+                if rules.insurance and not self.insurance_bet and _IS_ACE[self.dealer_hand[0]]:
+                    legal.append(INSURANCE)
+        return legal
+
+    def _insurance_payout(self):
+        if not self.insurance_bet:
+            return 0
+        return 2 * self.insurance_bet if self.dealer_blackjack() else -self.insurance_bet
+
+    def _finish_hand(self):
+        """
+        Ends the current hand. Starts the next split hand if one is waiting, otherwise
+        the dealer plays (unless every hand busted) and all hands of the round are settled.
+        Returns: tuple of (new state, reward, gameover status).
+        """
+        bet = 2 * self.current_bet if self.doubled else self.current_bet
+        self.finished_hands.append((self.player_hand, self.player_hard, self.player_aces, bet, self.from_split))
+        if self.split_cards:
+            card = self.split_cards.pop()
+            self.player_hand = [card]
+            self.player_hard = _VALUES[card]
+            self.player_aces = _IS_ACE[card]
+            self.doubled = False
+            self._deal_player()
+            return self._get_state(), 0, False
+
+        reward = self._insurance_payout()
+        if self.rules.dealer_peek and self.dealer_blackjack():
+            # the round ended at the peek, before any double or split: only the original bet is settled
+            hand, hard, aces, _, from_split = self.finished_hands[0]
+            reward += self._outcome(hard, aces, len(hand), self.current_bet, from_split)[1]
+            self.bankroll += reward
+            self.game_over = True
+            return self._get_state(), reward, True
+        if any(hard <= 21 for _, hard, _, _, _ in self.finished_hands):
+            self.dealer_play()
+        for hand, hard, aces, bet, from_split in self.finished_hands:
+            reward += -bet if hard > 21 else self._outcome(hard, aces, len(hand), bet, from_split)[1]
+        self.bankroll += reward
+        self.game_over = True
+        return self._get_state(), reward, True
+
+    def step(self, action):
+      """
+      Takes an action and updates the game state. With several hands after a split, the hands are
+      played one after another and the reward of the whole round is returned when the last one ends.
+      Args: 
+        action: action to take at a certain state, by name ('hit', 'stand', 'double', 'split', 'surrender',
+            'insurance') or code (HIT, STAND, ...). Actions other than hit and stand must be allowed by the rules.
+      Returns: tuple of (new state, reward, gameover status).
+      """
+      if action == "hit" or action == HIT:
+          if self.from_split and not self.rules.hit_split_aces and _IS_ACE[self.player_hand[0]]:
+              raise ValueError("Split aces take one card only")
+          self._deal_player()
+          if self.player_hard > 21:
+              if self.split_count or self.insurance_bet:
+                  return self._finish_hand()
+              self.game_over = True
+              return self._get_state(), -self.current_bet, True
+          return self._get_state(), 0, False
+      elif action == "stand" or action == STAND:
+          if self.split_count or self.insurance_bet:
+              return self._finish_hand()
+          self.dealer_play()
+          outcome, reward = self.check_winner()
+          self.bankroll += reward
+          self.game_over = True
+          return self._get_state(), reward, True
+
+      code = _ACTION_CODES.get(action, action) if isinstance(action, str) else action
+      if code not in self.legal_actions():
+          raise ValueError("Invalid action")
+      if code == DOUBLE:
+          self.doubled = True
+          self._deal_player()
+          return self._finish_hand()
+      elif code == SPLIT:
+          card = self.player_hand.pop()
+          self.player_hard -= _VALUES[card]
+          self.player_aces -= _IS_ACE[card]
+          self.split_cards.append(card)
+          self.split_count += 1
+          self.from_split = True
+          self._deal_player()
+          return self._get_state(), 0, False
+      elif code == SURRENDER:
+          # late surrender: a dealer blackjack takes the whole bet (found at the peek with dealer_peek,
+          # otherwise when the surrendered hand is settled against the hole card)
+          reward = -self.current_bet if self.dealer_blackjack() else -self.current_bet / 2
+          reward += self._insurance_payout()
+          self.bankroll += reward
+          self.game_over = True
+          return self._get_state(), reward, True
+      else: # INSURANCE
+          self.insurance_bet = self.current_bet / 2
+          return self._get_state(), 0, False
+
+
+class BatchBlackjackEnviron:
+    def __init__(self, num_envs, num_decks=6, num_when_to_shuffle=75, seed=None, shoe_source=None, rules=None,
+                 count_cards=False):
+        """
+        Initializes N independent Blackjack tables that are played in lockstep.
+        Each table has its own shoe held as an integer array, and the rules are the
+        same as BlackjackEnviron (same TableRules, same push logic).
+        Bets are fixed at 1, so rewards are in units of the bet.
+
+        Args:
+            num_envs: Number of tables (N) to simulate at once.
+            num_decks: Number of decks to use in each shoe.
+            num_when_to_shuffle: Number of cards left in a shoe at which it is reshuffled.
+            seed: Seed (or numpy Generator) for shuffling the shoes.
+            shoe_source: Optional source of pre-shuffled shoes (shoe.ShoeStream or shoe.RecordedShoes) to use instead.
+            rules: Optional TableRules (default: the hit/stand game).
+            count_cards: Whether to keep a Hi-Lo running count per shoe, and the true count each round starts with
+                (round_true_count, e.g. to size bets).
+        """
+        self.num_envs = num_envs
+        self.num_decks = num_decks
+        self.num_when_to_shuffle = num_when_to_shuffle
+        self.rules = rules if rules is not None else TableRules()
+        self.actions = self.rules.action_names()
+        # whether any action beyond hit/stand is allowed (otherwise every round is a single hand with bet 1)
+        self.extended = len(self.actions) > 2
+        self.rng = np.random.default_rng(seed)
+        self.shoe_source = _check_shoe_source(shoe_source, num_decks)
+        self.shoe_size = 52 * num_decks
+        # one shoe per row, stored as int8 to keep N shoes small in memory
+        if self.shoe_source is not None:
+            self.shoes = np.array(self.shoe_source.next_shoes(num_envs), dtype=np.int8)
+        else:
+            self.shoes = self.rng.permuted(np.tile(np.arange(52, dtype=np.int8), (num_envs, num_decks)), axis=1)
+        self.positions = np.zeros(num_envs, dtype=np.int64) # index of the next card in each shoe
+
+        # each hand is tracked as (hard total with aces as 1, ace count, card count)
+        self.player_hard = np.zeros(num_envs, dtype=np.int64)
+        self.player_aces = np.zeros(num_envs, dtype=np.int64)
+        self.player_cards = np.zeros(num_envs, dtype=np.int64)
+        self.dealer_hard = np.zeros(num_envs, dtype=np.int64)
+        self.dealer_aces = np.zeros(num_envs, dtype=np.int64)
+        self.dealer_cards = np.zeros(num_envs, dtype=np.int64)
+        self.dealer_upcard = np.zeros(num_envs, dtype=np.int64)
+        self.running_count = np.zeros(num_envs, dtype=np.int64) if count_cards else None
+        self.round_true_count = np.zeros(num_envs) if count_cards else None
+
+        # current hand: value of its first card (to spot pairs), bet, whether it came from a split
+        self.player_first = np.zeros(num_envs, dtype=np.int64)
+        self.bets = np.ones(num_envs)
+        self.from_split = np.zeros(num_envs, dtype=bool)
+        self.insurance = np.zeros(num_envs)
+        self.split_count = np.zeros(num_envs, dtype=np.int64)
+        # split hands are fixed-size slots per table: split cards waiting for their hand (a stack of
+        # (hard, aces)), and the (hard, aces, cards, bet, from split) of hands already played this round
+        slots = self.rules.max_splits + 1
+        self.num_pending = np.zeros(num_envs, dtype=np.int64)
+        self.pending_hard = np.zeros((num_envs, slots), dtype=np.int64)
+        self.pending_aces = np.zeros((num_envs, slots), dtype=np.int64)
+        self.num_finished = np.zeros(num_envs, dtype=np.int64)
+        self.finished_hard = np.zeros((num_envs, slots), dtype=np.int64)
+        self.finished_aces = np.zeros((num_envs, slots), dtype=np.int64)
+        self.finished_cards = np.zeros((num_envs, slots), dtype=np.int64)
+        self.finished_bets = np.zeros((num_envs, slots))
+        self.finished_split = np.zeros((num_envs, slots), dtype=bool)
+        self.reset()
+
+    def deal_cards(self, idx):
+        """
+        Deals the top card of each selected shoe, reshuffling shoes that hit the threshold.
+        Args:
+            idx: integer array of table indices to deal to.
+        Returns: integer array of cards (0-51), one per selected table.
+        """
+        low = idx[self.shoe_size - self.positions[idx] <= self.num_when_to_shuffle]
+        if low.size:
+            if self.shoe_source is not None:
+                self.shoes[low] = self.shoe_source.next_shoes(low.size)
+            else:
+                self.shoes[low] = self.rng.permuted(self.shoes[low], axis=1)
+            self.positions[low] = 0
+            if self.running_count is not None:
+                self.running_count[low] = 0
+        cards = self.shoes[idx, self.positions[idx]]
+        self.positions[idx] += 1
+        if self.running_count is not None:
+            self.running_count[idx] += HI_LO[cards]
+        return cards
+
+    def _deal_player(self, idx):
+        cards = self.deal_cards(idx)
+        self.player_hard[idx] += CARD_VALUES[cards]
+        self.player_aces[idx] += CARD_IS_ACE[cards]
+        self.player_cards[idx] += 1
+
+    def _deal_dealer(self, idx):
+        cards = self.deal_cards(idx)
+        self.dealer_hard[idx] += CARD_VALUES[cards]
+        self.dealer_aces[idx] += CARD_IS_ACE[cards]
+        self.dealer_cards[idx] += 1
+        return cards
+
+    @staticmethod
+    def hand_values(hard, aces):
+        """
+        Calculates hand values from hard totals and ace counts, counting one ace as 11 when it does not bust.
+        Returns: arrays of (hand value, usable ace).
+        """
+        usable = (aces > 0) & (hard + 10 <= 21)
+        return np.where(usable, hard + 10, hard), usable
+
+    def reset(self, idx=None):
+        """
+        Starts a new round at the selected tables (all of them by default).
+        Args:
+            idx: optional integer array of table indices to reset.
+        Returns: the states of all tables.
+        """
+        if idx is None:
+            idx = np.arange(self.num_envs)
+        self.player_hard[idx] = 0
+        self.player_aces[idx] = 0
+        self.player_cards[idx] = 0
+        self.dealer_hard[idx] = 0
+        self.dealer_aces[idx] = 0
+        self.dealer_cards[idx] = 0
+        if self.extended:
+            self.bets[idx] = 1.0
+            self.from_split[idx] = False
+            self.insurance[idx] = 0.0
+            self.split_count[idx] = 0
+            self.num_finished[idx] = 0
+        if self.running_count is not None:
+            # the count a bet would be placed on, before the round is dealt (0 if the shoe is about to be reshuffled)
+            cards_left = self.shoe_size - self.positions[idx]
+            self.round_true_count[idx] = np.where(cards_left <= self.num_when_to_shuffle, 0.0,
+                                                  self.running_count[idx] * 52 / cards_left)
+        # same dealing order as BlackjackEnviron.start_game
+        self._deal_player(idx)
+        if self.extended:
+            self.player_first[idx] = self.player_hard[idx]
+        self._deal_player(idx)
+        upcards = self._deal_dealer(idx)
+        self._deal_dealer(idx)
+        upcard_values = CARD_VALUES[upcards]
+        self.dealer_upcard[idx] = np.where(upcard_values == 1, 11, upcard_values)
+        return self._get_states()
+
+    def _get_states(self):
+        """
+        Returns: (N, 3) integer array of states (player total, dealer upcard value, usable ace).
+        """
+        total, usable = self.hand_values(self.player_hard, self.player_aces)
+        return np.stack([total, self.dealer_upcard, usable.astype(np.int64)], axis=1)
+
+    def legal_actions(self):
+        """
+        Gets the actions allowed in the current hand of every table (same rules as BlackjackEnviron.legal_actions).
+        Returns: (N, 6) boolean mask, indexed by action code.
+        """
+        rules = self.rules
+        legal = np.zeros((self.num_envs, len(ACTION_NAMES)), dtype=bool)
+        legal[:, STAND] = True
+        two_cards = self.player_cards == 2
+        split_aces = self.from_split & (self.player_first == 1)
+        no_hit = split_aces & (not rules.hit_split_aces)
+        legal[:, HIT] = ~no_hit
+        if rules.double:
+            legal[:, DOUBLE] = two_cards & ~no_hit & (rules.double_after_split | ~self.from_split)
+        if rules.max_splits:
+            pair = two_cards & (self.player_hard == 2 * self.player_first)
+            legal[:, SPLIT] = pair & (self.split_count < rules.max_splits) & (rules.resplit_aces | ~split_aces)
+        first_decision = two_cards & (self.split_count == 0)
+        if rules.surrender:
+            legal[:, SURRENDER] = first_decision
+        if rules.insurance:
+            legal[:, INSURANCE] = first_decision & (self.dealer_upcard == 11) & (self.insurance == 0)
+        return legal
+
+    def dealer_play(self, idx):
+        """
+        Dealer plays out the hands at the selected tables, hitting below 17 and on
+        17 while holding an ace unless the table stands on soft 17 (same rule as BlackjackEnviron.dealer_play).
+        """
+        hits_soft17 = self.rules.dealer_hits_soft17
+        while idx.size:
+            value, _ = self.hand_values(self.dealer_hard[idx], self.dealer_aces[idx])
+            idx = idx[(value < 17) | ((value == 17) & (self.dealer_aces[idx] > 0) & hits_soft17)]
+            if idx.size:
+                self._deal_dealer(idx)
+
+    def dealer_blackjack(self, idx):
+        """
+        Returns: boolean array of whether the dealer's first two cards are a blackjack at the selected tables.
+        """
+        value, _ = self.hand_values(self.dealer_hard[idx], self.dealer_aces[idx])
+        return (self.dealer_cards[idx] == 2) & (value == 21)
+
+    def _payouts(self, idx, player_value, player_cards, from_split):
+        # payouts for a bet of 1; extra player axes (split hands) broadcast against the tables in idx
+        dealer_value, _ = self.hand_values(self.dealer_hard[idx], self.dealer_aces[idx])
+        dealer_blackjack = (self.dealer_cards[idx] == 2) & (dealer_value == 21)
+        if player_value.ndim > 1:
+            dealer_value = dealer_value[:, None]
+            dealer_blackjack = dealer_blackjack[:, None]
+        player_blackjack = (player_cards == 2) & (player_value == 21) & ~from_split
+
+        # later assignments take precedence, mirroring the order of checks in check_winner
+        reward = np.where((dealer_value > 21) | (player_value > dealer_value), 1.0, -1.0)
+        dealer_wins = np.broadcast_to(dealer_blackjack, reward.shape)
+        reward[dealer_wins] = -1.0
+        reward[player_value == dealer_value] = 0.0
+        if self.rules.dealer_peek:
+            reward[dealer_wins] = -1.0 # a player 21 never gets to push against a peeked blackjack
+        reward[player_blackjack] = self.rules.blackjack_payout
+        reward[player_blackjack & dealer_blackjack] = 0.0
+        # a busted hand loses even if the dealer busts with the same total
+        reward[player_value > 21] = -1.0
+        return reward
+
+    def check_winner(self, idx):
+        """
+        Determines the payout of the current hand at the selected tables, following BlackjackEnviron.check_winner.
+        Returns: array of payouts for a bet of 1.
+        """
+        player_value, _ = self.hand_values(self.player_hard[idx], self.player_aces[idx])
+        return self._payouts(idx, player_value, self.player_cards[idx], self.from_split[idx])
+
+    def _insurance_payouts(self, idx):
+        insurance = self.insurance[idx]
+        return np.where(self.dealer_blackjack(idx), 2 * insurance, -insurance)
+
+    def _split(self, idx):
+        # the hand is a pair, so the split card is worth half of the hard total and ace count
+        half_hard = self.player_hard[idx] // 2
+        half_aces = self.player_aces[idx] // 2
+        slot = self.num_pending[idx]
+        self.pending_hard[idx, slot] = half_hard
+        self.pending_aces[idx, slot] = half_aces
+        self.num_pending[idx] += 1
+        self.split_count[idx] += 1
+        self.player_hard[idx] = half_hard
+        self.player_aces[idx] = half_aces
+        self.player_cards[idx] = 1
+        self.from_split[idx] = True
+        self._deal_player(idx)
+
+    def _finish_hands(self, idx, rewards, dones):
+        """
+        Ends the current hand at the selected tables. Tables with a split card waiting start its hand,
+        the others have the dealer play (unless every hand busted) and settle all hands of the round.
+        """
+        slot = self.num_finished[idx]
+        self.finished_hard[idx, slot] = self.player_hard[idx]
+        self.finished_aces[idx, slot] = self.player_aces[idx]
+        self.finished_cards[idx, slot] = self.player_cards[idx]
+        self.finished_bets[idx, slot] = self.bets[idx]
+        self.finished_split[idx, slot] = self.from_split[idx]
+        self.num_finished[idx] += 1
+
+        waiting = self.num_pending[idx] > 0
+        next_idx = idx[waiting]
+        if next_idx.size:
+            self.num_pending[next_idx] -= 1
+            slot = self.num_pending[next_idx]
+            self.player_hard[next_idx] = self.player_first[next_idx] = self.pending_hard[next_idx, slot]
+            self.player_aces[next_idx] = self.pending_aces[next_idx, slot]
+            self.player_cards[next_idx] = 1
+            self.bets[next_idx] = 1.0
+            self._deal_player(next_idx)
+
+        idx = idx[~waiting]
+        if idx.size:
+            values, _ = self.hand_values(self.finished_hard[idx], self.finished_aces[idx])
+            played = np.arange(values.shape[1]) < self.num_finished[idx, None]
+            rewards[idx] = self._insurance_payouts(idx)
+            self.dealer_play(idx[(played & (values <= 21)).any(axis=1)])
+            payouts = self._payouts(idx, values, self.finished_cards[idx], self.finished_split[idx])
+            settled = (payouts * self.finished_bets[idx] * played).sum(axis=1)
+            if self.rules.dealer_peek:
+                # a peeked blackjack ends the round before any double or split: only the original bet counts
+                settled = np.where(self.dealer_blackjack(idx), payouts[:, 0], settled)
+            rewards[idx] += settled
+            dones[idx] = True
+
+    def step(self, actions):
+        """
+        Takes one action at every table and updates the game states.
+        Tables whose round ends are automatically reset to a new round. After a split, the hands of a
+        table are played one after another and the reward of the whole round comes when the last one ends.
+        Args:
+            actions: integer array of shape (N,) of action codes (HIT, STAND, and the ones the rules allow).
+        Returns: tuple of (new states, rewards, done mask); states of finished tables are their new round's state.
+        """
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"Expected actions of shape ({self.num_envs},)")
+        hit = actions == HIT
+        stand = actions == STAND
+        if self.extended:
+            known = (actions >= 0) & (actions < len(ACTION_NAMES))
+            if not known.all() or not self.legal_actions()[np.arange(self.num_envs), actions].all():
+                raise ValueError("Invalid action")
+        elif not np.all(hit | stand):
+            raise ValueError("Invalid action")
+
+        rewards = np.zeros(self.num_envs)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        if self.extended:
+            self._step_extended(actions, hit, stand, rewards, dones)
+        else:
+            hit_idx = np.flatnonzero(hit)
+            if hit_idx.size:
+                self._deal_player(hit_idx)
+                value, _ = self.hand_values(self.player_hard[hit_idx], self.player_aces[hit_idx])
+                bust = hit_idx[value > 21]
+                rewards[bust] = -1.0
+                dones[bust] = True
+
+            stand_idx = np.flatnonzero(stand)
+            if stand_idx.size:
+                self.dealer_play(stand_idx)
+                rewards[stand_idx] = self.check_winner(stand_idx)
+                dones[stand_idx] = True
+
+        done_idx = np.flatnonzero(dones)
+        if done_idx.size:
+            self.reset(done_idx)
+        return self._get_states(), rewards, dones
+
+    def _step_extended(self, actions, hit, stand, rewards, dones):
+        finish = stand.copy() # tables whose current hand ends this step
+
+        hit_idx = np.flatnonzero(hit)
+        if hit_idx.size:
+            self._deal_player(hit_idx)
+            finish[hit_idx[self.player_hard[hit_idx] > 21]] = True
+
+        double_idx = np.flatnonzero(actions == DOUBLE)
+        if double_idx.size:
+            self.bets[double_idx] = 2.0
+            self._deal_player(double_idx)
+            finish[double_idx] = True
+
+        split_idx = np.flatnonzero(actions == SPLIT)
+        if split_idx.size:
+            self._split(split_idx)
+
+        insurance_idx = np.flatnonzero(actions == INSURANCE)
+        self.insurance[insurance_idx] = 0.5
+
+        surrender_idx = np.flatnonzero(actions == SURRENDER)
+        if surrender_idx.size:
+            # late surrender: a dealer blackjack still takes the whole bet (see TableRules.dealer_peek)
+            rewards[surrender_idx] = np.where(self.dealer_blackjack(surrender_idx), -1.0, -0.5)
+            rewards[surrender_idx] += self._insurance_payouts(surrender_idx)
+            dones[surrender_idx] = True
+
+        finish_idx = np.flatnonzero(finish)
+        if finish_idx.size:
+            self._finish_hands(finish_idx, rewards, dones)
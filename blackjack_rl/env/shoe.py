@@ -0,0 +1,131 @@
+import queue
+import threading
+import numpy as np
+
+class ShoeStream:
+    def __init__(self, num_decks=6, block_size=1024, seed=None, background=True, queue_size=4):
+        """
+        Source of shuffled shoes that pre-generates them in blocks with a seedable numpy Generator.
+        With background=True, blocks are generated ahead of time by a background thread, so dealing
+        never waits on shuffling. Shoes are integer cards (0-51, see blackjack_environ), and both environments
+        deal each shoe from its first card.
+
+        Args:
+            num_decks: Number of decks in each shoe.
+            block_size: Number of shoes shuffled at once.
+            seed: Seed (or numpy Generator) for shuffling.
+            background: Whether to generate blocks in a background thread.
+            queue_size: Number of blocks the background thread keeps ready.
+        """
+        self.num_decks = num_decks
+        self.shoe_size = 52 * num_decks
+        self.rng = np.random.default_rng(seed)
+        self._base = np.tile(np.arange(52, dtype=np.int8), (block_size, num_decks))
+        self._block = self._base[:0]
+        self._row = 0
+        self._queue = None
+        self._stop = threading.Event()
+        if background:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._produce, daemon=True)
+            self._thread.start()
+
+    def _make_block(self):
+        return self.rng.permuted(self._base, axis=1)
+
+    def _produce(self):
+        while not self._stop.is_set():
+            block = self._make_block()
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(block, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def _next_block(self):
+        return self._queue.get() if self._queue is not None else self._make_block()
+
+    def next_shoes(self, count):
+        """
+        Returns: (count, shoe size) int8 array of shuffled shoes.
+        """
+        parts = []
+        while count > 0:
+            if self._row >= len(self._block):
+                self._block = self._next_block()
+                self._row = 0
+            take = min(count, len(self._block) - self._row)
+            parts.append(self._block[self._row:self._row + take])
+            self._row += take
+            count -= take
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def next_shoe(self):
+        """
+        Returns: one shuffled shoe as a list of integer cards.
+        """
+        return self.next_shoes(1)[0].tolist()
+
+    def close(self):
+        """
+        Stops the background thread.
+        """
+        self._stop.set()
+
+class RecordedShoes:
+    def __init__(self, path, loop=True):
+        """
+        Replays shoes recorded by record_shoes, memory-mapped from a .npy file, for reproducible benchmarks.
+        Both environments deal each shoe from its first card, so the same recording deals the same cards to
+        a BlackjackEnviron and to a one-table BatchBlackjackEnviron.
+
+        Args:
+            path: path of the recorded shoes (.npy).
+            loop: whether to start over from the first shoe after the last one (otherwise raises StopIteration).
+        """
+        self.shoes = np.load(path, mmap_mode='r')
+        self.shoe_size = self.shoes.shape[1]
+        self.num_decks = self.shoe_size // 52
+        self.loop = loop
+        self._row = 0
+
+    def next_shoes(self, count):
+        """
+        Returns: (count, shoe size) int8 array of the next recorded shoes.
+        """
+        rows = self._row + np.arange(count)
+        if rows[-1] >= len(self.shoes):
+            if not self.loop:
+                raise StopIteration("No recorded shoes left")
+            rows %= len(self.shoes)
+        self._row = int(rows[-1]) + 1
+        return np.asarray(self.shoes[rows])
+
+    def next_shoe(self):
+        """
+        Returns: the next recorded shoe as a list of integer cards.
+        """
+        return self.next_shoes(1)[0].tolist()
+
+    def close(self):
+        pass
+
+def record_shoes(path, num_shoes, num_decks=6, seed=None, block_size=1024):
+    """
+    Generates shuffled shoes and writes them to a .npy file that RecordedShoes can replay.
+
+    Args:
+        path: path of the output file (.npy).
+        num_shoes: number of shoes to record.
+        num_decks: number of decks in each shoe.
+        seed: seed for shuffling.
+        block_size: number of shoes generated at once.
+    """
+    stream = ShoeStream(num_decks, block_size, seed, background=False)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.int8, shape=(num_shoes, stream.shoe_size))
+    for start in range(0, num_shoes, block_size):
+        count = min(block_size, num_shoes - start)
+        out[start:start + count] = stream.next_shoes(count)
+    out.flush()
+    del out
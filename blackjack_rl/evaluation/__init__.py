@@ -0,0 +1,6 @@
+"""
+Policy evaluation: batched and compiled evaluation of fixed policies, and bankroll simulation.
+"""
+from .evaluator import RunningStats, compare_policies, evaluate_policy
+from .policy_kernel import available_backends, evaluate_hands
+from .bankroll import CountSpread, FlatBet, KellyBet, simulate_bankrolls
@@ -0,0 +1,175 @@
+import numpy as np
+from ..env import blackjack_environ
+from . import evaluator
+from .evaluator import RunningStats
+
+class FlatBet:
+    def __init__(self, units=1):
+        """
+        Bets the same amount every hand.
+
+        Args:
+            units: bet size.
+        """
+        self.units = units
+
+    def bets(self, bankrolls, true_counts):
+        """
+        Returns: array of bet sizes, one per bankroll.
+        """
+        return np.full(len(bankrolls), float(self.units))
+
+class KellyBet:
+    def __init__(self, edge, fraction=0.5, variance=1.3, edge_per_count=0.0):
+        """
+        Bets a fraction of the Kelly bet, edge / variance of the current bankroll.
+        The edge can grow with the true count (about 0.005 per true count point for Hi-Lo).
+        When the edge is not positive the minimum bet is placed.
+
+        Args:
+            edge: expected return per unit bet at a true count of 0 (e.g. the EV from evaluator.evaluate_policy).
+            fraction: fraction of the full Kelly bet (0.5 is half Kelly).
+            variance: variance of the return per unit bet (about 1.3 for blackjack).
+            edge_per_count: extra edge per point of true count.
+        """
+        self.edge = edge
+        self.fraction = fraction
+        self.variance = variance
+        self.edge_per_count = edge_per_count
+
+    def bets(self, bankrolls, true_counts):
+        edge = self.edge + self.edge_per_count * true_counts
+        return self.fraction * np.maximum(edge, 0.0) / self.variance * bankrolls
+
+class CountSpread:
+    def __init__(self, ramp=((1, 2), (2, 4), (3, 6), (4, 8)), unit=1):
+        """
+        Spreads bets by the true count (floored): units times the multiplier of the highest
+        threshold reached, and one unit below the first threshold.
+
+        Args:
+            ramp: (true count threshold, bet multiplier) pairs in increasing order.
+            unit: betting unit.
+        """
+        self.thresholds = np.array([count for count, _ in ramp], dtype=float)
+        self.multipliers = np.array([1] + [multiplier for _, multiplier in ramp], dtype=float)
+        self.unit = unit
+
+    def bets(self, bankrolls, true_counts):
+        steps = np.searchsorted(self.thresholds, np.floor(true_counts), side='right')
+        return self.unit * self.multipliers[steps]
+
+def simulate_bankrolls(policy, strategy=None, num_players=100000, hands=1000, start_bankroll=100, min_bet=1,
+                       hands_per_hour=100, batch_size=100000, seed=None, num_decks=6, num_when_to_shuffle=75,
+                       rules=None, drawdown_bins=100):
+    """
+    Simulates independent bankroll trajectories (one table per player) under a playing policy and a
+    betting strategy, all players of a batch in lockstep. Only streaming aggregates are kept, never
+    the trajectories: running mean/variance of the results, a ruin count per hour and a histogram of
+    the largest drawdown of each player. A player is ruined once the bankroll is below min_bet.
+
+    Args:
+        policy: QTable or policy array the hands are played with (see evaluator.evaluate_policy).
+        strategy: betting strategy (FlatBet, KellyBet, CountSpread or any object with a bets(bankrolls, true_counts)
+            method), FlatBet() by default. Bets are clipped to [min_bet, bankroll].
+        num_players: number of bankroll trajectories.
+        hands: number of hands each player plays (unless ruined first).
+        start_bankroll: bankroll each player starts with.
+        min_bet: table minimum.
+        hands_per_hour: hands played per hour, for the hourly results.
+        batch_size: number of players simulated at once.
+        seed: seed for the shoes and random actions.
+        num_decks: number of decks in each shoe.
+        num_when_to_shuffle: number of cards left at which a shoe is reshuffled.
+        rules: optional blackjack_environ.TableRules.
+        drawdown_bins: number of bins of the drawdown histogram (as a fraction of the peak bankroll).
+    Returns: dictionary with the risk of ruin (overall and by hour), final bankroll, hourly EV (total result
+        over total hands played, times hands_per_hour), EV per unit wagered and drawdown statistics.
+    """
+    policy = evaluator.as_policy(policy)
+    strategy = strategy if strategy is not None else FlatBet()
+    rng = np.random.default_rng(seed)
+    num_hours = int(np.ceil(hands / hands_per_hour))
+    finals = RunningStats()
+    drawdowns = RunningStats()
+    ruined_total = 0
+    won_total = 0.0
+    wagered_total = 0.0
+    # sums over players of the net result x and hands played h (and their squares and products),
+    # for the hourly EV (total result over total hands) and its ratio-estimator confidence interval
+    hands_total = 0
+    sum_xx = sum_hh = sum_xh = 0.0
+    ruin_by_hour = np.zeros(num_hours, dtype=np.int64)
+    drawdown_hist = np.zeros(drawdown_bins, dtype=np.int64)
+
+    for first in range(0, num_players, batch_size):
+        n = min(batch_size, num_players - first)
+        env = blackjack_environ.BatchBlackjackEnviron(n, num_decks, num_when_to_shuffle, seed=rng.spawn(1)[0],
+                                                      rules=rules, count_cards=True)
+        bankroll = np.full(n, float(start_bankroll))
+        peak = bankroll.copy()
+        max_drawdown = np.zeros(n)
+        max_drawdown_frac = np.zeros(n)
+        wagered = np.zeros(n)
+        played = np.zeros(n, dtype=np.int64)
+        ruined = np.zeros(n, dtype=bool)
+        active = np.ones(n, dtype=bool) # players still playing (later hands at finished tables are ignored)
+        bets = np.clip(strategy.bets(bankroll, env.round_true_count), min_bet, bankroll)
+        states = env._get_states()
+
+        while active.any():
+            states, rewards, dones = env.step(evaluator.policy_actions(policy, states, rng))
+            idx = np.flatnonzero(dones & active)
+            if not idx.size:
+                continue
+            bankroll[idx] += bets[idx] * rewards[idx]
+            wagered[idx] += bets[idx]
+            played[idx] += 1
+            peak[idx] = np.maximum(peak[idx], bankroll[idx])
+            drop = peak[idx] - bankroll[idx]
+            max_drawdown[idx] = np.maximum(max_drawdown[idx], drop)
+            max_drawdown_frac[idx] = np.maximum(max_drawdown_frac[idx], drop / peak[idx])
+            ruined[idx] = bankroll[idx] < min_bet
+            active[idx] = ~ruined[idx] & (played[idx] < hands)
+            # bets for the round just dealt at these tables, on the count before it was dealt
+            idx = idx[active[idx]]
+            bets[idx] = np.clip(strategy.bets(bankroll[idx], env.round_true_count[idx]), min_bet, bankroll[idx])
+
+        net = bankroll - start_bankroll
+        finals.update(bankroll)
+        drawdowns.update(max_drawdown)
+        ruined_total += ruined.sum()
+        won_total += net.sum()
+        hands_total += played.sum()
+        sum_xx += (net * net).sum()
+        sum_hh += (played * played.astype(float)).sum()
+        sum_xh += (net * played).sum()
+        wagered_total += wagered.sum()
+        ruin_by_hour += np.bincount((played[ruined] - 1) // hands_per_hour, minlength=num_hours)[:num_hours]
+        bins = np.minimum((max_drawdown_frac * drawdown_bins).astype(np.int64), drawdown_bins - 1)
+        drawdown_hist += np.bincount(bins, minlength=drawdown_bins)
+
+    risk_of_ruin = ruined_total / num_players
+    # ruined players play fewer hands, so the EV per hand is weighted by hands played
+    ev_per_hand = won_total / hands_total
+    residual_variance = max(sum_xx - 2 * ev_per_hand * sum_xh + ev_per_hand ** 2 * sum_hh, 0.0) / max(num_players - 1, 1)
+    ev_per_hand_ci = 1.96 * np.sqrt(residual_variance / num_players) / (hands_total / num_players)
+    # quantiles of the drawdown fraction, read off the upper edges of the histogram bins
+    cumulative = np.cumsum(drawdown_hist) / num_players
+    quantiles = {q: (np.searchsorted(cumulative, q) + 1) / drawdown_bins for q in (0.5, 0.9, 0.95, 0.99)}
+    return {
+        'players': num_players,
+        'hands': hands,
+        'risk_of_ruin': risk_of_ruin,
+        'risk_of_ruin_ci': 1.96 * np.sqrt(risk_of_ruin * (1 - risk_of_ruin) / num_players),
+        'ruin_by_hour': np.cumsum(ruin_by_hour) / num_players,
+        'final_bankroll': finals.mean,
+        'final_bankroll_std': np.sqrt(finals.variance()),
+        'hourly_ev': ev_per_hand * hands_per_hour,
+        'hourly_ev_ci': ev_per_hand_ci * hands_per_hour,
+        'ev_per_unit_wagered': won_total / wagered_total,
+        'max_drawdown': drawdowns.mean,
+        'max_drawdown_std': np.sqrt(drawdowns.variance()),
+        'drawdown_fraction_quantiles': quantiles,
+        'drawdown_histogram': drawdown_hist,
+    }
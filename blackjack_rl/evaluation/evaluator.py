@@ -0,0 +1,175 @@
+import numpy as np
+from ..env import blackjack_environ
+from ..agents import q_table
+
+class RunningStats:
+    def __init__(self):
+        """
+        Running count, mean and variance of a stream of values, updated one batch at a time.
+        """
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # sum of squared differences from the mean
+
+    def update(self, values):
+        """
+        Adds a batch of values (merging batch mean/variance into the running ones).
+        """
+        values = np.asarray(values, dtype=float)
+        n = values.size
+        if n == 0:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.inf
+
+    def ci_halfwidth(self, z=1.96):
+        """
+        Returns: half-width of the normal confidence interval of the mean.
+        """
+        return z * np.sqrt(self.variance() / self.count) if self.count > 1 else np.inf
+
+def as_policy(policy):
+    """
+    Converts a QTable (greedy actions) or a policy array to a policy array of action indices
+    per (player total, dealer upcard, usable ace), where -1 means a random action.
+    A CountQTable is averaged over the count first, since the batch environment does not count cards.
+    """
+    if isinstance(policy, q_table.CountQTable):
+        policy = policy.collapse()
+    if isinstance(policy, q_table.QTable):
+        return policy.greedy_policy()
+    return np.asarray(policy)
+
+def policy_actions(policy, states, rng):
+    """
+    Looks up the action of a policy array for a batch of states, drawing a random action (hit or stand) for states with -1.
+    Returns: integer array of actions.
+    """
+    actions = policy[states[:, 0], states[:, 1], states[:, 2]]
+    unseen = actions < 0
+    if unseen.any():
+        actions = np.where(unseen, rng.integers(0, 2, size=len(actions)), actions)
+    return actions
+
+def _play_round(env, policy, rng):
+    """
+    Plays exactly one hand at every table of a batch environment, starting from a fresh deal.
+    Tables that finish early keep stepping (their extra hands are ignored), so every hand counts once.
+    Returns: array of rewards, one per table.
+    """
+    states = env.reset()
+    rewards = np.zeros(env.num_envs)
+    finished = np.zeros(env.num_envs, dtype=bool)
+    while not finished.all():
+        states, step_rewards, dones = env.step(policy_actions(policy, states, rng))
+        newly = dones & ~finished
+        rewards[newly] = step_rewards[newly]
+        finished |= dones
+    return rewards
+
+def _done(stats, hands, ci_width, min_hands, max_hands, z):
+    if hands >= max_hands:
+        return True
+    if ci_width is None or hands < min_hands:
+        return False
+    return all(s.ci_halfwidth(z) * 2 <= ci_width for s in stats)
+
+def evaluate_policy(policy, ci_width=0.01, max_hands=10000000, min_hands=10000, batch_size=20000,
+                    z=1.96, seed=None, num_decks=6, num_when_to_shuffle=75, rules=None):
+    """
+    Evaluates a fixed policy by streaming vectorized batches of hands, keeping running mean/variance
+    of the win rate and EV per hand, and stopping once both confidence intervals are narrow enough.
+    When it stops, hands already in progress are played out and counted, but no new hands are counted
+    (so long hands are not under-represented).
+
+    Args:
+        policy: QTable (greedy actions) or array of action indices per (player total, dealer upcard, usable ace),
+            e.g. solver.solve().policy. States with -1 get a random action.
+        ci_width: target full width of the confidence intervals (None plays max_hands hands).
+        max_hands: maximum number of hands to play (hands in progress count towards it).
+        min_hands: minimum number of hands before stopping on the confidence interval.
+        batch_size: number of tables played in lockstep.
+        z: z-score for the confidence intervals (1.96 for 95%).
+        seed: seed for the shoes and random actions.
+        num_decks: number of decks in each shoe.
+        num_when_to_shuffle: number of cards left at which a shoe is reshuffled.
+        rules: optional blackjack_environ.TableRules the hands are played under (the policy only hits or stands).
+    Returns: dictionary with the number of hands, win rate and EV with their confidence interval half-widths.
+    """
+    policy = as_policy(policy)
+    rng = np.random.default_rng(seed)
+    num_envs = min(batch_size, max_hands)
+    env = blackjack_environ.BatchBlackjackEnviron(num_envs, num_decks, num_when_to_shuffle, seed=rng, rules=rules)
+    wins = RunningStats()
+    returns = RunningStats()
+    states = env.reset()
+    counting = np.ones(num_envs, dtype=bool) # tables whose current hand will be counted
+    draining = False
+    while counting.any():
+        if not draining and _done((wins, returns), returns.count + num_envs, ci_width, min_hands, max_hands, z):
+            draining = True
+        states, rewards, dones = env.step(policy_actions(policy, states, rng))
+        finished = rewards[dones & counting]
+        wins.update(finished > 0)
+        returns.update(finished)
+        if draining:
+            counting &= ~dones
+    return {
+        'hands': returns.count,
+        'win_rate': wins.mean,
+        'win_rate_ci': wins.ci_halfwidth(z),
+        'ev': returns.mean,
+        'ev_ci': returns.ci_halfwidth(z),
+    }
+
+def compare_policies(policy_a, policy_b, ci_width=0.005, max_hands=10000000, min_hands=10000, batch_size=20000,
+                     z=1.96, seed=None, num_decks=6, num_when_to_shuffle=75, rules=None):
+    """
+    Compares two policies with common random numbers: before every batch, both environments are given
+    the same shoes, so each pair of hands starts from the same cards. The EV difference is estimated from
+    the paired per-hand differences, which is much less noisy than evaluating each policy separately.
+
+    Args:
+        policy_a, policy_b: policies to compare (see evaluate_policy).
+        ci_width: target full width of the confidence interval of the EV difference (None plays max_hands hands).
+        Other arguments are the same as evaluate_policy.
+    Returns: dictionary with the number of hands, each policy's EV and the EV difference (a - b) with its confidence interval half-width.
+    """
+    policy_a = as_policy(policy_a)
+    policy_b = as_policy(policy_b)
+    rng = np.random.default_rng(seed)
+    num_envs = min(batch_size, max_hands)
+    env_a = blackjack_environ.BatchBlackjackEnviron(num_envs, num_decks, num_when_to_shuffle, seed=rng.spawn(1)[0], rules=rules)
+    env_b = blackjack_environ.BatchBlackjackEnviron(num_envs, num_decks, num_when_to_shuffle, seed=rng.spawn(1)[0], rules=rules)
+    actions_rng = rng.spawn(1)[0]
+    returns_a = RunningStats()
+    returns_b = RunningStats()
+    diffs = RunningStats()
+    while not _done((diffs,), diffs.count, ci_width, min_hands, max_hands, z):
+        # common random numbers: env_b starts the batch from env_a's shoes and shuffle RNG
+        env_b.shoes[:] = env_a.shoes
+        env_b.positions[:] = env_a.positions
+        env_b.rng.bit_generator.state = env_a.rng.bit_generator.state
+        actions_state = actions_rng.bit_generator.state
+        rewards_a = _play_round(env_a, policy_a, actions_rng)
+        actions_rng.bit_generator.state = actions_state
+        rewards_b = _play_round(env_b, policy_b, actions_rng)
+        keep = max_hands - diffs.count
+        returns_a.update(rewards_a[:keep])
+        returns_b.update(rewards_b[:keep])
+        diffs.update(rewards_a[:keep] - rewards_b[:keep])
+    return {
+        'hands': diffs.count,
+        'ev_a': returns_a.mean,
+        'ev_b': returns_b.mean,
+        'ev_diff': diffs.mean,
+        'ev_diff_ci': diffs.ci_halfwidth(z),
+    }
@@ -0,0 +1,198 @@
+import importlib.util
+import numpy as np
+from ..env import blackjack_environ
+from ..env.blackjack_environ import CARD_VALUES, CARD_IS_ACE, HIT
+from . import evaluator
+
+# numba is an optional dependency (the NumPy backend is used without it), imported and compiled on first use
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+_compiled = None
+
+def _play_hands(policy, hands, shoe, position, num_when_to_shuffle, hits_soft17, blackjack_payout, dealer_peek,
+                seed, card_values, card_is_ace):
+    """
+    Plays `hands` hit/stand hands from one shoe under a fixed policy, with the same dealing order, dealer rule
+    and payouts as BatchBlackjackEnviron.step (compiled with Numba; the shoe is shuffled in place when it runs low).
+    Returns: (wins, losses, pushes, sum of rewards, sum of squared rewards, shoe position after the last hand).
+    """
+    np.random.seed(seed) # the random stream of the compiled code, separate from NumPy's
+    size = shoe.shape[0]
+    wins = 0
+    losses = 0
+    pushes = 0
+    total = 0.0
+    total_sq = 0.0
+    for _ in range(hands):
+        # player, player, dealer upcard, dealer hole card
+        player_hard = 0
+        player_aces = 0
+        dealer_hard = 0
+        dealer_aces = 0
+        upcard = 0
+        for i in range(4):
+            if size - position <= num_when_to_shuffle:
+                np.random.shuffle(shoe)
+                position = 0
+            card = shoe[position]
+            position += 1
+            if i < 2:
+                player_hard += card_values[card]
+                player_aces += card_is_ace[card]
+            else:
+                dealer_hard += card_values[card]
+                dealer_aces += card_is_ace[card]
+                if i == 2:
+                    upcard = 11 if card_values[card] == 1 else card_values[card]
+        player_cards = 2
+
+        busted = False
+        while True:
+            usable = player_aces > 0 and player_hard + 10 <= 21
+            value = player_hard + 10 if usable else player_hard
+            action = policy[value, upcard, 1 if usable else 0]
+            if action < 0: # unseen state: random hit or stand
+                action = 0 if np.random.random() < 0.5 else 1
+            if action != HIT:
+                break
+            if size - position <= num_when_to_shuffle:
+                np.random.shuffle(shoe)
+                position = 0
+            card = shoe[position]
+            position += 1
+            player_hard += card_values[card]
+            player_aces += card_is_ace[card]
+            player_cards += 1
+            if player_hard > 21: # aces already count as 1 in the hard total
+                busted = True
+                break
+
+        if busted:
+            reward = -1.0
+        else:
+            player_value = player_hard + 10 if player_aces > 0 and player_hard + 10 <= 21 else player_hard
+            dealer_cards = 2
+            while True:
+                dealer_value = dealer_hard + 10 if dealer_aces > 0 and dealer_hard + 10 <= 21 else dealer_hard
+                if dealer_value < 17 or (dealer_value == 17 and dealer_aces > 0 and hits_soft17):
+                    if size - position <= num_when_to_shuffle:
+                        np.random.shuffle(shoe)
+                        position = 0
+                    card = shoe[position]
+                    position += 1
+                    dealer_hard += card_values[card]
+                    dealer_aces += card_is_ace[card]
+                    dealer_cards += 1
+                else:
+                    break
+            dealer_blackjack = dealer_cards == 2 and dealer_value == 21
+            player_blackjack = player_cards == 2 and player_value == 21
+            # same order of checks as BatchBlackjackEnviron._payouts
+            reward = 1.0 if dealer_value > 21 or player_value > dealer_value else -1.0
+            if dealer_blackjack:
+                reward = -1.0
+            if player_value == dealer_value:
+                reward = 0.0
+            if dealer_blackjack and dealer_peek:
+                reward = -1.0
+            if player_blackjack:
+                reward = blackjack_payout
+                if dealer_blackjack:
+                    reward = 0.0
+
+        if reward > 0:
+            wins += 1
+        elif reward < 0:
+            losses += 1
+        else:
+            pushes += 1
+        total += reward
+        total_sq += reward * reward
+    return wins, losses, pushes, total, total_sq, position
+
+def _play_hands_compiled():
+    global _compiled
+    if _compiled is None:
+        import numba
+        _compiled = numba.njit(cache=True)(_play_hands)
+    return _compiled
+
+def available_backends():
+    """
+    Returns: list of the backends evaluate_hands can use, fastest first.
+    """
+    return (['numba'] if HAS_NUMBA else []) + ['numpy']
+
+def _numba_counts(policy, hands, rng, num_decks, num_when_to_shuffle, rules):
+    shoe = rng.permuted(np.tile(np.arange(52, dtype=np.int8), num_decks))
+    wins, losses, pushes, total, total_sq, _ = _play_hands_compiled()(
+        policy, hands, shoe, 0, num_when_to_shuffle, rules.dealer_hits_soft17, float(rules.blackjack_payout),
+        rules.dealer_peek, int(rng.integers(2**32)), CARD_VALUES, CARD_IS_ACE)
+    return wins, losses, pushes, total, total_sq
+
+def _numpy_counts(policy, hands, rng, num_decks, num_when_to_shuffle, rules, batch_size):
+    env = blackjack_environ.BatchBlackjackEnviron(min(batch_size, hands), num_decks, num_when_to_shuffle, seed=rng,
+                                                  rules=rules)
+    wins = losses = pushes = 0
+    total = total_sq = 0.0
+    played = 0
+    while played < hands:
+        rewards = evaluator._play_round(env, policy, rng)[:hands - played]
+        wins += int((rewards > 0).sum())
+        losses += int((rewards < 0).sum())
+        pushes += int((rewards == 0).sum())
+        total += float(rewards.sum())
+        total_sq += float((rewards ** 2).sum())
+        played += rewards.size
+    return wins, losses, pushes, total, total_sq
+
+def evaluate_hands(policy, hands=100000, seed=None, num_decks=6, num_when_to_shuffle=75, rules=None, backend='auto',
+                   z=1.96, batch_size=20000):
+    """
+    Plays a fixed number of hit/stand hands under a fixed policy and counts the outcomes. With Numba installed,
+    whole hands are played inside one compiled loop (a policy lookup table in, outcome counts out); otherwise
+    the hands are played in vectorized batches of a BatchBlackjackEnviron. Both follow the rules of step and
+    check_winner, but they draw different random numbers, so the same seed gives different (equally valid) hands.
+
+    Args:
+        policy: QTable (greedy actions) or array of action indices per (player total, dealer upcard, usable ace),
+            e.g. solver.solve().policy. States with -1 get a random hit or stand.
+        hands: number of hands to play.
+        seed: seed (or numpy Generator) for the shoe and the random actions.
+        num_decks: number of decks in the shoe.
+        num_when_to_shuffle: number of cards left at which the shoe is reshuffled.
+        rules: optional blackjack_environ.TableRules (only the dealer's soft 17 rule, the blackjack payout and
+            dealer_peek matter, since the policy only hits or stands).
+        backend: 'numba', 'numpy' or 'auto' (Numba if installed).
+        z: z-score for the confidence intervals (1.96 for 95%).
+        batch_size: number of tables played in lockstep by the NumPy backend.
+    Returns: dictionary with the number of hands, win/loss/push counts, win rate and EV with their confidence
+        interval half-widths, and the backend used.
+    """
+    if backend == 'auto':
+        backend = available_backends()[0]
+    if backend == 'numba' and not HAS_NUMBA:
+        raise ImportError("The numba backend needs the numba package")
+    if backend not in ('numba', 'numpy'):
+        raise ValueError(f"Unknown backend: {backend}")
+    policy = np.ascontiguousarray(evaluator.as_policy(policy), dtype=np.int64)
+    rules = rules if rules is not None else blackjack_environ.TableRules()
+    rng = np.random.default_rng(seed)
+    if backend == 'numba':
+        wins, losses, pushes, total, total_sq = _numba_counts(policy, hands, rng, num_decks, num_when_to_shuffle, rules)
+    else:
+        wins, losses, pushes, total, total_sq = _numpy_counts(policy, hands, rng, num_decks, num_when_to_shuffle, rules,
+                                                              batch_size)
+    win_rate = wins / hands
+    ev = total / hands
+    ev_variance = (total_sq - hands * ev ** 2) / (hands - 1) if hands > 1 else np.inf
+    return {
+        'hands': hands,
+        'wins': wins,
+        'losses': losses,
+        'pushes': pushes,
+        'win_rate': win_rate,
+        'win_rate_ci': z * np.sqrt(win_rate * (1 - win_rate) / hands),
+        'ev': ev,
+        'ev_ci': z * np.sqrt(ev_variance / hands),
+        'backend': backend,
+    }
@@ -0,0 +1,156 @@
+import json
+import time
+
+# phases of a training run that are timed
+PHASES = ['action_selection', 'env_step', 'td_update', 'checkpoint_copy', 'accuracy_eval', 'autosave']
+
+class Instrumentation:
+    def __init__(self, path=None, sample_every=5000, profile_window=None, profile_path='train.prof', profiler='cprofile'):
+        """
+        Optional instrumentation for train(): per-phase timers, counters and periodic throughput samples,
+        written as JSON records (one per line) to a metrics file, plus an optional profile of a window of episodes.
+        train() only times its phases when an Instrumentation is passed, so it costs nothing when disabled.
+
+        Args:
+            path: optional JSONL file to append the samples and the final summary to.
+            sample_every: number of episodes between throughput samples.
+            profile_window: optional (first, last) episode range to profile (last excluded).
+            profile_path: file to save the profile to (cProfile stats, or pyinstrument HTML).
+            profiler: 'cprofile' or 'pyinstrument' (needs the pyinstrument package).
+        """
+        self.path = path
+        self.sample_every = sample_every
+        self.profile_window = profile_window
+        self.profile_path = profile_path
+        self.profiler = profiler
+        self.timers = dict.fromkeys(PHASES, 0.0)
+        self.counters = {'episodes': 0, 'steps': 0, 'replenishments': 0}
+        self.samples = []
+        self._profile = None
+        self._start = time.perf_counter()
+        self._last_sample = (self._start, 0, 0) # time, episodes and steps at the last sample
+
+    def start(self):
+        """
+        Called by train() when its training loop starts, to start the clock.
+        """
+        self._start = time.perf_counter()
+        self._last_sample = (self._start, self.counters['episodes'], self.counters['steps'])
+
+    def write(self, record):
+        """
+        Appends a record to the metrics file, if there is one.
+        """
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def episode_start(self, episode):
+        """
+        Called by train() before every episode, to start and stop the profile window.
+        """
+        if self.profile_window is None:
+            return
+        first, last = self.profile_window
+        if episode == first:
+            self._start_profile()
+        elif episode == last and self._profile is not None:
+            self._stop_profile(episode)
+
+    def episode_end(self, episode, steps, epsilon, Q):
+        """
+        Called by train() after every episode; takes a throughput sample every sample_every episodes.
+
+        Args:
+            episode: number of episodes finished.
+            steps: number of steps (actions) in the episode.
+            epsilon: current exploration rate.
+            Q: QTable being trained (for the state counters).
+        """
+        self.counters['episodes'] += 1
+        self.counters['steps'] += steps
+        if episode % self.sample_every == 0:
+            self.sample(episode, epsilon, Q)
+
+    def sample(self, episode, epsilon, Q):
+        """
+        Records the throughput since the last sample, the cumulative phase times and the counters.
+        Returns: the sample record.
+        """
+        now = time.perf_counter()
+        last_time, last_episodes, last_steps = self._last_sample
+        elapsed = max(now - last_time, 1e-12)
+        record = {
+            'type': 'sample',
+            'episode': episode,
+            'elapsed': now - self._start,
+            'episodes_per_s': (self.counters['episodes'] - last_episodes) / elapsed,
+            'steps_per_s': (self.counters['steps'] - last_steps) / elapsed,
+            'epsilon': float(epsilon),
+            'timers': dict(self.timers),
+            'counters': dict(self.counters, **state_counters(Q)),
+        }
+        self._last_sample = (now, self.counters['episodes'], self.counters['steps'])
+        self.samples.append(record)
+        self.write(record)
+        return record
+
+    def _start_profile(self):
+        if self.profiler == 'pyinstrument':
+            import pyinstrument # optional dependency, only needed for this profiler
+            self._profile = pyinstrument.Profiler()
+            self._profile.start()
+        else:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def _stop_profile(self, episode):
+        if self.profiler == 'pyinstrument':
+            self._profile.stop()
+            with open(self.profile_path, 'w') as f:
+                f.write(self._profile.output_html())
+            top = []
+        else:
+            import pstats
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_path)
+            stats = pstats.Stats(self._profile).stats
+            # the 10 functions with the most time spent in themselves
+            top = sorted(((tottime, calls, f'{name[0]}:{name[1]}({name[2]})') for name, (_, calls, tottime, _, _) in stats.items()), reverse=True)[:10]
+            top = [{'function': name, 'calls': calls, 'tottime': tottime} for tottime, calls, name in top]
+        self._profile = None
+        self.write({'type': 'profile', 'window': list(self.profile_window), 'stopped_at': episode,
+                    'path': self.profile_path, 'top': top})
+
+    def close(self, episode, Q):
+        """
+        Called by train() when it finishes: ends a profile still running and writes the summary record.
+        Returns: the summary record (total time, share of time per phase, counters).
+        """
+        if self._profile is not None:
+            self._stop_profile(episode)
+        total = time.perf_counter() - self._start
+        record = {
+            'type': 'summary',
+            'episode': episode,
+            'elapsed': total,
+            'episodes_per_s': self.counters['episodes'] / total,
+            'timers': dict(self.timers),
+            'time_shares': {phase: seconds / total for phase, seconds in self.timers.items()},
+            'counters': dict(self.counters, **state_counters(Q)),
+        }
+        self.write(record)
+        return record
+
+def state_counters(Q):
+    """
+    Returns: dictionary of state counters of a QTable: states created, states visited, and the mean and max visits per visited state.
+    """
+    visits = Q.visits[Q.visits > 0]
+    return {
+        'states_created': int(Q.seen.sum()),
+        'states_visited': int(visits.size),
+        'mean_visits': float(visits.mean()) if visits.size else 0.0,
+        'max_visits': int(visits.max()) if visits.size else 0,
+    }
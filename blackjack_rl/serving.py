@@ -0,0 +1,283 @@
+import asyncio
+import json
+import numpy as np
+
+# the layout of q_table.QTable (repeated here so loading a policy does not import the training code)
+NUM_TOTALS = 32
+NUM_UPCARDS = 12
+ACTIONS = ('hit', 'stand')
+# valid range of each state column: (name, lowest, highest)
+STATE_COLUMNS = (('player total', 0, NUM_TOTALS - 1), ('dealer upcard', 2, NUM_UPCARDS - 1), ('usable ace', 0, 1))
+
+def _check_state_column(name, low, high, values):
+    # min/max are one pass each, the mask is only built to report the bad value
+    if len(values) and (values.min() < low or values.max() > high):
+        raise ValueError(f"{name} must be in {low}-{high}, got {values[(values < low) | (values > high)][0]}")
+
+class CompiledPolicy:
+    def __init__(self, table):
+        """
+        Hit/stand policy compiled to a flat int8 lookup table with one action index per
+        (player total, dealer upcard, usable ace), at index (total * 12 + upcard) * 2 + usable.
+        Only NumPy is needed to load and query it, so simulators and dashboards can use a trained
+        policy without importing the training code. Build one with compile_policy and load a saved one
+        with CompiledPolicy.load.
+
+        Args:
+            table: flat array of NUM_TOTALS * NUM_UPCARDS * 2 action indices (0 = hit, 1 = stand).
+        """
+        if table.shape != (NUM_TOTALS * NUM_UPCARDS * 2,):
+            raise ValueError(f"Expected a flat table of {NUM_TOTALS * NUM_UPCARDS * 2} actions, got shape {table.shape}")
+        self.table = table
+        self._actions = table.tolist() # plain list for single lookups, which is faster than indexing the array
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Loads a policy written by save (a .npy file), memory-mapped by default.
+        """
+        return cls(np.load(path, mmap_mode='r' if mmap else None))
+
+    def save(self, path):
+        """
+        Saves the lookup table as a .npy file (readable with np.load on its own).
+        """
+        np.save(path, np.ascontiguousarray(self.table, dtype=np.int8))
+
+    @property
+    def grid(self):
+        """
+        Returns: the table as an array per (player total, dealer upcard, usable ace), like solver.solve().policy.
+        """
+        return np.asarray(self.table).reshape(NUM_TOTALS, NUM_UPCARDS, 2)
+
+    def __array__(self, dtype=None, copy=None):
+        # lets evaluate_policy / evaluate_hands take a CompiledPolicy directly
+        return self.grid if dtype is None else self.grid.astype(dtype)
+
+    def decide(self, states):
+        """
+        Looks up the actions of a batch of states.
+
+        Args:
+            states: integer array of shape (n, 3) with (player total 0-31, dealer upcard 2-11, usable ace 0/1) rows.
+        Returns: int8 array of n action indices (0 = hit, 1 = stand).
+        Raises: ValueError naming the column if any state is out of range (so it cannot map to another state).
+        """
+        states = self.check_states(states)
+        return self.table[(states[..., 0] * NUM_UPCARDS + states[..., 1]) * 2 + states[..., 2]]
+
+    @staticmethod
+    def check_states(states):
+        """
+        Validates a batch of states column by column (player total 0-31, dealer upcard 2-11, usable ace 0/1).
+        Returns: the states as an integer array of shape (n, 3).
+        Raises: ValueError naming the first bad column.
+        """
+        states = np.asarray(states)
+        if states.shape[-1:] != (3,):
+            raise ValueError(f"Expected states of shape (n, 3), got shape {states.shape}")
+        if states.dtype.kind not in 'iub':
+            raise ValueError(f"States must be integers, got {states.dtype}")
+        states = states.astype(np.intp, copy=False)
+        for column, (name, low, high) in enumerate(STATE_COLUMNS):
+            _check_state_column(name, low, high, states[..., column].reshape(-1))
+        return states
+
+    def action(self, total, upcard, usable):
+        """
+        Returns: the action index of one state (a Python int).
+        Raises: ValueError naming the value that is not an integer or out of range, like decide.
+        """
+        usable = int(usable) if isinstance(usable, (bool, np.bool_)) else usable # True/False is fine, 2 is not
+        for (name, low, high), value in zip(STATE_COLUMNS, (total, upcard, usable)):
+            if not isinstance(value, (int, np.integer)):
+                raise ValueError(f"{name} must be an integer, got {value!r}")
+            if not low <= value <= high:
+                raise ValueError(f"{name} must be in {low}-{high}, got {value}")
+        return self._actions[(total * NUM_UPCARDS + upcard) * 2 + usable]
+
+def compile_policy(policy, fallback='basic'):
+    """
+    Compiles a trained policy to a CompiledPolicy.
+
+    Args:
+        policy: QTable (greedy actions) or array of action indices per (player total, dealer upcard, usable ace),
+            e.g. solver.solve().policy.
+        fallback: action for states the policy has no action for (-1, e.g. states never seen in training):
+            'basic' for basic strategy, 'hit' or 'stand'. Totals above 21 always stand.
+    Returns: CompiledPolicy
+    """
+    from .evaluation import evaluator
+    grid = np.array(evaluator.as_policy(policy), dtype=np.int8)
+    missing = grid < 0
+    if fallback == 'basic':
+        from .agents.q_agent import basic_strategy_policy
+        grid[missing] = basic_strategy_policy()[missing]
+    elif fallback in ACTIONS:
+        grid[missing] = ACTIONS.index(fallback)
+    else:
+        raise ValueError(f"Unknown fallback: {fallback}")
+    grid[grid < 0] = ACTIONS.index('stand')
+    grid[22:] = ACTIONS.index('stand')
+    return CompiledPolicy(grid.reshape(-1))
+
+class PolicyServer:
+    def __init__(self, policy, host='127.0.0.1', port=8000, max_batch=65536, max_delay=0.001):
+        """
+        Local HTTP service for a CompiledPolicy, built on asyncio. Concurrent requests are queued and
+        answered together: the server waits up to max_delay seconds (or until max_batch states are queued),
+        looks all of them up with one decide call and splits the actions back per request.
+
+        Endpoints:
+            POST /decide with {"states": [[player total, dealer upcard, usable ace], ...]}
+                returns {"actions": [0 or 1, ...]} (0 = hit, 1 = stand).
+            GET /health returns {"status": "ok"}.
+
+        Args:
+            policy: CompiledPolicy to serve.
+            host: address to listen on.
+            port: port to listen on (0 picks a free port, see self.port once started).
+            max_batch: most states looked up in one batch.
+            max_delay: longest time in seconds a request waits for others to join its batch.
+        """
+        self.policy = policy
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.requests = 0
+        self._queue = None
+        self._server = None
+        self._batcher = None
+
+    async def start(self):
+        """
+        Starts listening and batching in the running event loop.
+        """
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batches())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """
+        Stops listening and cancels the batching task.
+        """
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def decide(self, states):
+        """
+        Queues one request's states for the next batch.
+        Returns: the int8 array of their actions.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((states, future))
+        return await future
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_delay
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+            self.batches += 1
+            self.requests += len(pending)
+            try:
+                actions = self.policy.decide(np.concatenate([states for states, _ in pending]))
+            except ValueError:
+                # answer each request on its own, so one bad request does not fail the others
+                for states, future in pending:
+                    if future.done():
+                        continue
+                    try:
+                        future.set_result(self.policy.decide(states))
+                    except ValueError as e:
+                        future.set_exception(e)
+                continue
+            start = 0
+            for states, future in pending:
+                if not future.done(): # the client may have gone away
+                    future.set_result(actions[start:start + len(states)])
+                start += len(states)
+
+    async def _handle(self, reader, writer):
+        # minimal HTTP/1.1 with keep-alive: one JSON request and response at a time per connection
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, response = await self._respond(method, path, body)
+                payload = json.dumps(response).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return '200 OK', {'status': 'ok'}
+        if method != 'POST' or path != '/decide':
+            return '404 Not Found', {'error': f"No endpoint {method} {path}"}
+        try:
+            states = np.asarray(json.loads(body)['states'])
+            if states.size == 0:
+                states = states.reshape(0, 3).astype(np.intp)
+            if states.ndim != 2:
+                raise ValueError(f"Expected a list of [player total, dealer upcard, usable ace] states, got shape {states.shape}")
+            # checked before queueing, so a bad request never reaches (or fails) a shared batch
+            actions = await self.decide(CompiledPolicy.check_states(states))
+        except (KeyError, TypeError, ValueError) as e:
+            return '400 Bad Request', {'error': str(e)}
+        return '200 OK', {'actions': actions.tolist()}
+
+def serve(policy, host='127.0.0.1', port=8000, max_batch=65536, max_delay=0.001):
+    """
+    Runs a PolicyServer until interrupted.
+
+    Args:
+        policy: CompiledPolicy, or path of a saved one.
+        host, port, max_batch, max_delay: see PolicyServer.
+    """
+    if not isinstance(policy, CompiledPolicy):
+        policy = CompiledPolicy.load(policy)
+    server = PolicyServer(policy, host, port, max_batch, max_delay)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,4 @@
+"""
+Exact solvers for the optimal hit/stand policy.
+"""
+from .solver import Solution, solve
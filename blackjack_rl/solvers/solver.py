@@ -0,0 +1,313 @@
+import numpy as np
+from functools import lru_cache
+from math import factorial
+from ..env import blackjack_environ
+from ..agents import q_table
+
+# dealer final outcomes, in the order used by dealer_distribution
+DEALER_OUTCOMES = [17, 18, 19, 20, 21, 'blackjack', 'bust']
+_BLACKJACK = 5
+_BUST = 6
+
+def card_probabilities(counts=None):
+    """
+    Gets the probability of drawing each card value.
+
+    Args:
+        counts: optional counts of cards left in the shoe by value (index 0 = ace, ..., index 9 = ten-valued cards).
+            If None, an infinite deck is assumed.
+    Returns: array of 10 probabilities (index 0 = ace, ..., index 9 = ten-valued cards).
+    """
+    if counts is None:
+        counts = [1] * 9 + [4]
+    counts = np.asarray(counts, dtype=float)
+    return counts / counts.sum()
+
+def shoe_counts(cards):
+    """
+    Counts cards by value for a list of integer cards (e.g. BlackjackEnviron.deck).
+    Returns: array of 10 counts (index 0 = ace, ..., index 9 = ten-valued cards).
+    """
+    values = blackjack_environ.CARD_VALUES[np.asarray(cards, dtype=np.int64)]
+    return np.bincount(values - 1, minlength=10)
+
+def dealer_distribution(upcard, probs):
+    """
+    Calculates the probability of each final dealer outcome (see DEALER_OUTCOMES) given the upcard,
+    following BlackjackEnviron.dealer_play (hits below 17 and on 17 while holding an ace).
+    The hole card is not checked for blackjack until the showdown, as in the environment.
+
+    Args:
+        upcard: dealer upcard value (2-11).
+        probs: card value probabilities from card_probabilities.
+    Returns: array of 7 outcome probabilities.
+    """
+    return _dealer_play(tuple(probs))(1 if upcard == 11 else upcard, upcard == 11, 1)
+
+def _dealer_play(probs):
+    @lru_cache(maxsize=None)
+    def play(hard, ace, cards):
+        # hard: total with aces as 1, ace: whether the hand holds an ace, cards: number of cards so far
+        dist = np.zeros(len(DEALER_OUTCOMES))
+        if hard > 21:
+            dist[_BUST] = 1.0
+            return dist
+        value = hard + 10 if ace and hard <= 11 else hard
+        if cards == 2 and value == 21:
+            dist[_BLACKJACK] = 1.0
+        elif value < 17 or (value == 17 and ace):
+            for i, p in enumerate(probs):
+                if p > 0:
+                    dist += p * play(hard + i + 1, ace or i == 0, cards + 1)
+        else:
+            dist[value - 17] = 1.0
+        return dist
+    return play
+
+@lru_cache(maxsize=None)
+def _dealer_hands(upcard):
+    # every set of cards the dealer can draw after the upcard (hole card first), with the number of orders
+    # they can be drawn in and the outcome they end in (the same for every order)
+    hands = {}
+    drawn = [0] * 10
+    def draw(hard, ace, cards):
+        value = hard + 10 if ace and hard <= 11 else hard
+        if hard > 21:
+            outcome = _BUST
+        elif cards == 2 and value == 21:
+            outcome = _BLACKJACK
+        elif value < 17 or (value == 17 and ace):
+            for i in range(10):
+                drawn[i] += 1
+                draw(hard + i + 1, ace or i == 0, cards + 1)
+                drawn[i] -= 1
+            return
+        else:
+            outcome = value - 17
+        hands.setdefault(tuple(drawn), [0, outcome])[0] += 1
+    draw(1 if upcard == 11 else upcard, upcard == 11, 1)
+    counts = np.array(list(hands), dtype=np.int64)
+    orders, outcomes = np.array(list(hands.values())).T
+    return counts, orders.astype(float), outcomes
+
+def _falling(counts, most):
+    # falling factorials counts * (counts - 1) * ... of 0 to `most` factors, one row per count
+    factors = np.maximum(np.asarray(counts, dtype=float)[..., None] - np.arange(most), 0)
+    return np.concatenate([np.ones(factors.shape[:-1] + (1,)), np.cumprod(factors, axis=-1)], axis=-1)
+
+def _draw_probabilities(counts, hands, orders):
+    # probability of drawing each set of cards (rows of `hands`) in one of its `orders` from a shoe with `counts`
+    sizes = hands.sum(axis=1)
+    ways = _falling(counts, hands.max())[np.arange(10), hands].prod(axis=1)
+    return orders * ways / _falling(np.sum(counts), sizes.max())[sizes]
+
+def _orders(hand, naturals=True):
+    # number of orders a player hand can be dealt in, without those starting with a blackjack (which ends
+    # the round) unless naturals is False
+    orders = factorial(sum(hand))
+    for m in hand:
+        orders //= factorial(m)
+    if naturals and hand[0] and hand[9]:
+        rest = list(hand)
+        rest[0] -= 1
+        rest[9] -= 1
+        natural = 2 * factorial(sum(rest))
+        for m in rest:
+            natural //= factorial(m)
+        orders -= natural
+    return orders
+
+def _solve_shoe(counts, q_values, valid, natural_evs):
+    """
+    Fills in the solution for a finite shoe, removing each card from the shoe as it is dealt (see solve).
+    Returns: the expected return per hand of composition-dependent optimal play.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    sums = np.zeros(q_values.shape)
+    weights = np.zeros(valid.shape)
+    ev = 0.0
+    for upcard in range(2, 12):
+        up = 0 if upcard == 11 else upcard - 1
+        if counts[up] == 0:
+            continue
+        shoe = counts.copy()
+        shoe[up] -= 1
+        dealer_cards, dealer_orders, dealer_outcomes = _dealer_hands(upcard)
+
+        def dealer_dist(hand):
+            p = _draw_probabilities(shoe - hand, dealer_cards, dealer_orders)
+            return np.bincount(dealer_outcomes, weights=p, minlength=len(DEALER_OUTCOMES))
+
+        evs = {} # player hand (cards by value) -> (hit EV, stand EV), playing on with the best action
+        def hand_evs(hand):
+            if hand in evs:
+                return evs[hand]
+            rest = shoe - hand
+            left = rest.sum()
+            hard = sum((i + 1) * m for i, m in enumerate(hand))
+            total = hard + 10 if hand[0] and hard <= 11 else hard
+            hit = 0.0
+            for i in range(10):
+                if rest[i] == 0:
+                    continue
+                p = rest[i] / left
+                if hard + i + 1 > 21:
+                    hit -= p
+                else:
+                    drawn = list(hand)
+                    drawn[i] += 1
+                    hit += p * max(hand_evs(tuple(drawn)))
+            evs[hand] = (hit, stand_ev(total, dealer_dist(np.array(hand))))
+            return evs[hand]
+
+        natural = (1,) + (0,) * 8 + (1,)
+        natural_evs[upcard] = 1.5 * (1 - dealer_dist(np.array(natural))[_BLACKJACK])
+        starts = [tuple(np.bincount([i, j], minlength=10).tolist()) for i in range(10) for j in range(i, 10)]
+        start_probs = _draw_probabilities(shoe, np.array(starts), np.array([float(_orders(h, False)) for h in starts]))
+        for hand, p in zip(starts, start_probs):
+            ev += counts[up] / counts.sum() * p * (natural_evs[upcard] if hand == natural else max(hand_evs(hand)))
+
+        # each state averages the hands that reach it, weighted by how likely they are to be dealt
+        hands = [hand for hand in evs if _orders(hand)]
+        reach = _draw_probabilities(shoe, np.array(hands), np.array([float(_orders(h)) for h in hands]))
+        for hand, w in zip(hands, reach):
+            hard = sum((i + 1) * m for i, m in enumerate(hand))
+            usable = int(bool(hand[0]) and hard <= 11)
+            total = hard + 10 * usable
+            sums[total, upcard, usable] += w * np.array(evs[hand])
+            weights[total, upcard, usable] += w
+    valid |= weights > 0
+    q_values[valid] = sums[valid] / weights[valid][:, None]
+    return ev
+
+def stand_ev(player_total, dist):
+    """
+    Expected return of standing on a (non-blackjack) player total, following BlackjackEnviron.check_winner.
+    A player 21 pushes against a dealer blackjack there, since equal totals are checked first.
+
+    Args:
+        player_total: player hand value (21 or less).
+        dist: dealer outcome distribution from dealer_distribution.
+    Returns: expected return for a bet of 1.
+    """
+    ev = dist[_BUST] - (dist[_BLACKJACK] if player_total < 21 else 0.0)
+    for i, dealer_total in enumerate(DEALER_OUTCOMES[:5]):
+        if player_total > dealer_total:
+            ev += dist[i]
+        elif player_total < dealer_total:
+            ev -= dist[i]
+    return ev
+
+class Solution:
+    def __init__(self, q_values, valid, natural_evs, probs, ev=None):
+        """
+        Exact hit/stand values for every (player total, dealer upcard, usable ace) state, returned by solve().
+
+        Args:
+            q_values: Q* array shaped like QTable.values, (player total, dealer upcard, usable ace, action).
+            valid: boolean array of the states that can be reached with the player total 21 or less.
+            natural_evs: expected return of a 2-card blackjack for each dealer upcard (index = upcard value).
+            probs: card value probabilities the solution was computed with.
+            ev: expected return per hand, if already computed (for a finite shoe).
+        """
+        self.q_values = q_values
+        self.valid = valid
+        self.natural_evs = natural_evs
+        self.probs = probs
+        self.ev = ev
+        self.policy = np.where(valid, q_values.argmax(axis=-1), -1)
+
+    def action(self, player_sum, dealer_upcard, usable_ace):
+        """
+        Returns the optimal action, with the same signature as basic_strategy_action.
+        Returns: action: a string 'hit' or 'stand'.
+        """
+        return 'hit' if self.policy[player_sum, dealer_upcard, 1 if usable_ace else 0] == blackjack_environ.HIT else 'stand'
+
+    def to_qtable(self):
+        """
+        Returns: the Q* values as a QTable (only valid states are present in its dict view).
+        """
+        Q = q_table.QTable(initial_value=0.0)
+        Q.values[:] = self.q_values
+        Q.seen[:] = self.valid
+        return Q
+
+    def expected_return(self):
+        """
+        Calculates the expected return per hand of playing the optimal policy, over all initial deals.
+        For a finite shoe, this is the return of playing every hand by its exact cards (see solve).
+        Returns: expected return for a bet of 1.
+        """
+        if self.ev is not None:
+            return self.ev
+        ev = 0.0
+        probs = self.probs
+        for up in range(10):
+            upcard = 11 if up == 0 else up + 1
+            for c1 in range(10):
+                for c2 in range(10):
+                    p = probs[up] * probs[c1] * probs[c2]
+                    hard = c1 + c2 + 2
+                    usable = (c1 == 0 or c2 == 0) and hard <= 11
+                    total = hard + 10 if usable else hard
+                    if total == 21:
+                        ev += p * self.natural_evs[upcard]
+                    else:
+                        ev += p * self.q_values[total, upcard, int(usable)].max()
+        return ev
+
+def solve(counts=None):
+    """
+    Solves the environment's hit/stand game exactly with dynamic programming over player hands,
+    using memoized dealer outcome distributions for each upcard.
+
+    With a finite shoe, every card dealt in the round (the upcard, the player's cards and the dealer's)
+    is removed from the shoe before the next draw, so the values of a hand depend on its exact cards.
+    Each hand is solved with the best action for its cards, and the value of a (player total, dealer upcard,
+    usable ace) state is the average over the hands that reach it, weighted by how likely they are to be
+    dealt. This takes a few seconds instead of milliseconds.
+
+    Args:
+        counts: optional counts of cards left in the shoe by value (see shoe_counts), e.g. a full shoe or
+            the cards left in BlackjackEnviron.deck. The round is assumed to be dealt from these cards,
+            so the shoe should hold enough of them to finish it. If None, an infinite deck is assumed.
+    Returns: Solution with the Q* table and optimal policy.
+    """
+    probs = card_probabilities(counts)
+    q_values = np.full((q_table.NUM_TOTALS, q_table.NUM_UPCARDS, 2, 2), np.nan)
+    valid = np.zeros((q_table.NUM_TOTALS, q_table.NUM_UPCARDS, 2), dtype=bool)
+    natural_evs = np.zeros(q_table.NUM_UPCARDS)
+    if counts is not None:
+        ev = _solve_shoe(counts, q_values, valid, natural_evs)
+        return Solution(q_values, valid, natural_evs, probs, ev)
+
+    for upcard in range(2, 12):
+        dist = dealer_distribution(upcard, probs)
+        # a player blackjack only pushes against a dealer blackjack
+        natural_evs[upcard] = 1.5 * (1 - dist[_BLACKJACK])
+
+        @lru_cache(maxsize=None)
+        def hit_ev(hard, ace):
+            ev = 0.0
+            for i, p in enumerate(probs):
+                new_hard = hard + i + 1
+                if new_hard > 21:
+                    ev -= p
+                elif p > 0:
+                    ev += p * best_ev(new_hard, ace or i == 0)
+            return ev
+
+        @lru_cache(maxsize=None)
+        def best_ev(hard, ace):
+            total = hard + 10 if ace and hard <= 11 else hard
+            return max(hit_ev(hard, ace), stand_ev(total, dist))
+
+        for total in range(4, 22):
+            q_values[total, upcard, 0] = (hit_ev(total, False), stand_ev(total, dist))
+            valid[total, upcard, 0] = True
+        for total in range(12, 22):
+            q_values[total, upcard, 1] = (hit_ev(total - 10, True), stand_ev(total, dist))
+            valid[total, upcard, 1] = True
+
+    return Solution(q_values, valid, natural_evs, probs)
@@ -0,0 +1,208 @@
+import json
+import os
+from . import checkpoint
+
+EVENTS_FILE = 'events.jsonl'
+FINAL_FILE = 'final.npz'
+SNAPSHOT_DIR = 'snapshots'
+
+def _snapshot_path(log_dir, episode):
+    return os.path.join(log_dir, SNAPSHOT_DIR, f'episode_{episode:08d}.npz')
+
+class TrainLog:
+    def __init__(self, log_dir):
+        """
+        Streaming sink for a training run. Episode aggregates, accuracy checks and bankroll replenishments
+        are appended to events.jsonl (one JSON record per line), and each checkpoint Q-table goes to its own
+        file under snapshots/, as soon as they happen. Nothing is kept in memory, and a run that is still
+        going (or crashed) can be read with TrainResult at any time.
+
+        Args:
+            log_dir: directory of the run's log (created if missing).
+        """
+        self.log_dir = log_dir
+        os.makedirs(os.path.join(log_dir, SNAPSHOT_DIR), exist_ok=True)
+
+    def write(self, record):
+        """
+        Appends one event record to events.jsonl.
+        """
+        with open(os.path.join(self.log_dir, EVENTS_FILE), 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def start(self, episode, config):
+        """
+        Records the start (or resumption) of training at an episode index.
+        """
+        self.write({'type': 'start', 'episode': episode, 'config': config})
+
+    def episodes(self, episode, count, wins, total_return, epsilon, bankroll):
+        """
+        Records the aggregates of the last `count` episodes, ending at `episode` episodes finished.
+        """
+        self.write({'type': 'episodes', 'episode': episode, 'count': count, 'wins': wins,
+                    'return': total_return, 'epsilon': float(epsilon), 'bankroll': float(bankroll)})
+
+    def replenish(self, episode, gap):
+        """
+        Records a bankroll replenishment after `episode` episodes, `gap` episodes after the previous one.
+        """
+        self.write({'type': 'replenish', 'episode': episode, 'gap': gap})
+
+    def snapshot(self, episode, Q, accuracy):
+        """
+        Saves the Q-table snapshot of a checkpoint and records its accuracy.
+        """
+        checkpoint.save_q_table(_snapshot_path(self.log_dir, episode), Q)
+        self.write({'type': 'accuracy', 'episode': episode, 'accuracy': float(accuracy)})
+
+    def finish(self, episode, Q):
+        """
+        Saves the final Q-table and records the end of training.
+        """
+        checkpoint.save_q_table(os.path.join(self.log_dir, FINAL_FILE), Q)
+        self.write({'type': 'finish', 'episode': episode})
+
+class SnapshotSequence:
+    def __init__(self, log_dir, episodes):
+        """
+        Read-only list of checkpoint Q-tables that loads each one from its snapshot file when accessed.
+        """
+        self.log_dir = log_dir
+        self.episodes = episodes
+
+    def __len__(self):
+        return len(self.episodes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SnapshotSequence(self.log_dir, self.episodes[index])
+        return checkpoint.load_q_table(_snapshot_path(self.log_dir, self.episodes[index]))
+
+    def __iter__(self):
+        for episode in self.episodes:
+            yield checkpoint.load_q_table(_snapshot_path(self.log_dir, episode))
+
+class TrainResult:
+    def __init__(self, log_dir):
+        """
+        Results of a training run logged by TrainLog, read lazily from its directory. The events are only
+        read (and the Q-tables only loaded) when first asked for, so it also works on a run that is still going.
+        Unpacks like the tuple train() returns without a log:
+        Q, state_visits, diffs, win_amt, total_return, accuracies, checkpoint_Qs, checkpoint_episodes = result
+
+        Args:
+            log_dir: directory of the run's log.
+        """
+        self.log_dir = log_dir
+        self._events = None
+
+    def events(self):
+        """
+        Reads the event records, dropping records a resumed run replaced: when training restarts at episode S,
+        earlier records past S are discarded (a checkpoint is labelled with the episodes finished when it was
+        taken, so one at S belongs to the saved run). Cached after the first call; refresh() reads the file again.
+        Returns: list of event records.
+        """
+        if self._events is None:
+            events = []
+            path = os.path.join(self.log_dir, EVENTS_FILE)
+            if os.path.exists(path):
+                with open(path) as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        record = json.loads(line)
+                        if record['type'] == 'start':
+                            start = record['episode']
+                            events = [e for e in events if e['episode'] <= start]
+                        events.append(record)
+            self._events = events
+        return self._events
+
+    def refresh(self):
+        """
+        Forgets the cached events, so the next access reads the latest state of a running training.
+        """
+        self._events = None
+
+    def _of_type(self, kind):
+        return [e for e in self.events() if e['type'] == kind]
+
+    @property
+    def finished(self):
+        return bool(self._of_type('finish'))
+
+    @property
+    def episodes(self):
+        """
+        Number of episodes finished so far.
+        """
+        aggregates = self._of_type('episodes')
+        return aggregates[-1]['episode'] if aggregates else 0
+
+    @property
+    def config(self):
+        starts = self._of_type('start')
+        return starts[-1]['config'] if starts else {}
+
+    @property
+    def win_amt(self):
+        return sum(e['wins'] for e in self._of_type('episodes'))
+
+    @property
+    def total_return(self):
+        return sum(e['return'] for e in self._of_type('episodes'))
+
+    @property
+    def diffs(self):
+        return [e['gap'] for e in self._of_type('replenish')]
+
+    @property
+    def accuracies(self):
+        return [e['accuracy'] for e in self._of_type('accuracy')]
+
+    @property
+    def convergence(self):
+        """
+        Convergence metrics of each checkpoint, if train() had a ConvergenceTracker (see convergence.py).
+        """
+        return [{k: v for k, v in e.items() if k != 'type'} for e in self._of_type('convergence')]
+
+    @property
+    def checkpoint_episodes(self):
+        return [e['episode'] for e in self._of_type('accuracy')]
+
+    @property
+    def checkpoint_Qs(self):
+        """
+        Checkpoint Q-tables as a SnapshotSequence (each one is loaded from disk when accessed).
+        """
+        return SnapshotSequence(self.log_dir, self.checkpoint_episodes)
+
+    @property
+    def Q(self):
+        """
+        Final Q-table, or the latest checkpoint's while the run has not finished.
+        """
+        if self.finished:
+            return checkpoint.load_q_table(os.path.join(self.log_dir, FINAL_FILE))
+        episodes = self.checkpoint_episodes
+        return checkpoint.load_q_table(_snapshot_path(self.log_dir, episodes[-1])) if episodes else None
+
+    @property
+    def state_visits(self):
+        Q = self.Q
+        return Q.state_visits() if Q is not None else {}
+
+    def __iter__(self):
+        Q = self.Q
+        yield Q
+        yield Q.state_visits() if Q is not None else {}
+        yield self.diffs
+        yield self.win_amt
+        yield self.total_return
+        yield self.accuracies
+        yield self.checkpoint_Qs
+        yield self.checkpoint_episodes
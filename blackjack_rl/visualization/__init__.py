@@ -0,0 +1,5 @@
+"""
+Heatmaps, accuracy plots and the evolution snapshots and GIFs (imports matplotlib and seaborn).
+"""
+from .render import plot_heatmap, render_evolution, write_gif
+from .plots import (eval_accuracy, eval_replenish, plot_basic_strategy, plot_evolution, plot_policy_and_agreement)
@@ -0,0 +1,158 @@
+import os
+import numpy as np
+from ..agents.q_agent import basic_strategy_action, policy_agreement, q_to_grid_stack, q_to_grids
+from . import render
+from .render import plot_heatmap
+
+def eval_replenish(diffs, diffs_rand=None, show=True):
+    """
+    Plots how long it takes for a bankroll replenishment over episodes.
+    """
+    import matplotlib.pyplot as plt # pyplot is imported late, so a backend can be selected first
+    plt.plot(range(len(diffs)), np.array(diffs), label='Q-Agent')
+    if diffs_rand:
+        plt.plot(range(len(diffs)), np.array(diffs_rand[:len(diffs)]), label='Random Agent')
+    plt.xlabel('Number of Replenishments')
+    plt.ylabel('Episodes Since Last Replenishment')
+    plt.title('Episodes Since Last Replenishment (Blackjack)')
+    _show_or_close(plt, show)
+
+def eval_accuracy(accuracies, accuracies_rand=None, episodes=1000, save=False, savepath="accuracy.png", show=True):
+    """
+    Plots accuracy over time for the Q-learning agent and optionally the random agent.
+    Evaluated on epsilon = 0, every batch amount of episodes.
+    If show is False, the figure is only saved (when save is True) and closed.
+    """
+    import matplotlib.pyplot as plt
+    # Plotting accuracy every 1000 episodes by default
+    plt.plot(range(len(accuracies)), np.array(accuracies), label='Q-Agent')
+    if accuracies_rand:
+        plt.plot(range(len(accuracies_rand)), np.array(accuracies_rand), label='Random Agent')
+    plt.xlabel(f'Trial (every {episodes} episodes)')
+    plt.ylabel('Accuracy')
+    plt.title('Accuracy (Blackjack)')
+    if save:
+        plt.savefig(savepath, dpi=200)
+    _show_or_close(plt, show)
+    
+
+def _show_or_close(plt, show):
+    # shows the current figure, or just closes it when running headless
+    if show:
+        plt.show()
+    else:
+        plt.close()
+
+def plot_basic_strategy(title_suffix='', savepath=None, show=True):
+    """
+    Plots the basic strategy for blackjack.
+    """
+    import matplotlib.pyplot as plt
+    pr = list(range(4, 22))
+    dr = list(range(2, 12))
+
+    # Basic strategy: 1 = hit, 0 = stand
+    basic_strategy_hard = np.full((len(pr), len(dr)), np.nan)
+    basic_strategy_soft = np.full((len(pr), len(dr)), np.nan)
+
+    for i, p in enumerate(pr):
+        for j, d in enumerate(dr):
+            action = basic_strategy_action(p, d, False)
+            basic_strategy_hard[i, j] = 1 if action == 'hit' else 0
+
+            action = basic_strategy_action(p, d, True)
+            basic_strategy_soft[i, j] = 1 if action == 'hit' else 0
+
+    # Plotting
+    fig, axes = plt.subplots(1, 2, figsize=(15, 6))
+    
+    plot_heatmap(basic_strategy_hard, pr, dr, f'Basic Strategy Hard {title_suffix}', cmap='coolwarm', vmin=0, vmax=1, ax=axes[0])
+    plot_heatmap(basic_strategy_soft, pr, dr, f'Basic Strategy Soft {title_suffix}', cmap='coolwarm', vmin=0, vmax=1, ax=axes[1])
+
+    plt.tight_layout()
+    if savepath:
+        plt.savefig(savepath)
+    _show_or_close(plt, show)
+
+def plot_policy_and_agreement(Q, title_suffix='', savepath=None, reference=None, show=True):
+    """
+    Checks policy from Q table against basic strategy (or another reference policy, see policy_agreement) and plot results.
+    If show is False, the figure is only saved (when savepath is given) and closed.
+    """
+    import matplotlib.pyplot as plt
+    grids = q_to_grids(Q)
+    pr = grids['player_range']
+    dr = grids['dealer_range']
+
+    # preference heatmaps: 1 = hit, 0 = stand
+    pref_hard = grids['pref_hard']
+    pref_soft = grids['pref_soft']
+    covered_hard = grids['covered_hard']
+    covered_soft = grids['covered_soft']
+
+    # compute basic strategy agreement
+    agreement = policy_agreement(grids, reference)
+    agree_hard = agreement['agree_hard']
+    agree_soft = agreement['agree_soft']
+
+    # Q-difference heatmaps
+    qdiff_hard = grids['qdiff_hard']
+    qdiff_soft = grids['qdiff_soft']
+
+    # Plotting heatmaps
+    fig, axes = plt.subplots(2, 3, figsize=(18, 10))
+    plot_heatmap(pref_hard, pr, dr, f'Policy Hard {title_suffix} (1=Hit,0=Stand)', cmap='coolwarm', vmin=0, vmax=1, mask=~covered_hard, ax=axes[0,0])
+    plot_heatmap(qdiff_hard, pr, dr, f'Q_hit - Q_stand Hard {title_suffix}', cmap='RdBu_r', vmin=-2, vmax=2, mask=~covered_hard, ax=axes[0,1])
+    plot_heatmap(agree_hard, pr, dr, f'Agreement Hard {title_suffix}', cmap='Greens', vmin=0, vmax=1, mask=~covered_hard, ax=axes[0,2])
+
+    plot_heatmap(pref_soft, pr, dr, f'Policy Soft {title_suffix} (1=Hit,0=Stand)', cmap='coolwarm', vmin=0, vmax=1, mask=~covered_soft, ax=axes[1,0])
+    plot_heatmap(qdiff_soft, pr, dr, f'Q_hit - Q_stand Soft {title_suffix}', cmap='RdBu_r', vmin=-2, vmax=2, mask=~covered_soft, ax=axes[1,1])
+    plot_heatmap(agree_soft, pr, dr, f'Agreement Soft {title_suffix}', cmap='Greens', vmin=0, vmax=1, mask=~covered_soft, ax=axes[1,2])
+
+    plt.tight_layout()
+    if savepath:
+        plt.savefig(savepath, dpi=200)
+    _show_or_close(plt, show)
+
+    # summary stats (accounting for NaNs)
+    hard_cov_frac = agreement['coverage_hard']
+    soft_cov_frac = agreement['coverage_soft']
+    hard_agree = agreement['agreement_hard']
+    soft_agree = agreement['agreement_soft']
+    print(f"Coverage hard: {hard_cov_frac:.3f}, soft: {soft_cov_frac:.3f}")
+    print(f"Agreement hard: {hard_agree:.3f}, soft: {soft_agree:.3f}")
+
+    return {
+        'coverage_hard': hard_cov_frac,
+        'coverage_soft': soft_cov_frac,
+        'agreement_hard': hard_agree,
+        'agreement_soft': soft_agree
+    }
+
+def plot_evolution(checkpoint_Qs, episodes, ncols=3, save_prefix=None, workers=None, save_snaps=True, make_gifs=True, show=True,
+                   output_dir='.'):
+    """
+    Plots across checkpoints given list of Qs into saved figures if given save_prefix.
+    The per-checkpoint snapshots (evolution_snaps/, diff_heatmap_snaps/) and their GIFs
+    (evolution.gif, qdiffs.gif) are rendered headless in a process pool (see render.render_evolution).
+
+    Args:
+        workers: number of processes for rendering (None uses all cores, 1 renders in this process).
+        save_snaps: whether to save the per-checkpoint PNG snapshots.
+        make_gifs: whether to write the GIFs.
+        show: whether to show the grid of all checkpoints; if False, it is only rendered (headless, in the pool) when saved.
+        output_dir: directory for the snapshots, GIFs and the saved grid.
+    """
+    stack = q_to_grid_stack(checkpoint_Qs) # all checkpoints at once
+    episodes = list(episodes[:len(checkpoint_Qs)])
+    grid_path = os.path.join(output_dir, f"{save_prefix}_snapshot_{len(episodes)-1}.png") if save_prefix else None
+    render.render_evolution(stack, episodes, output_dir, workers=workers, save_snaps=save_snaps, make_gifs=make_gifs,
+                            grid_path=None if show else grid_path, ncols=ncols)
+
+    if show:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=render.evolution_grid_size(len(episodes), ncols))
+        render.draw_evolution_grid(fig, stack, episodes, ncols)
+        if grid_path:
+            plt.savefig(grid_path, dpi=200)
+        plt.show()
@@ -0,0 +1,198 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import seaborn as sns
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+
+# per-checkpoint snapshot kinds: (snapshot directory, gif name, grid key, title, heatmap settings)
+SNAP_KINDS = {
+    'policy': ('evolution_snaps', 'evolution.gif', 'pref', '{side} Policy {title}', dict(cmap='coolwarm', vmin=0, vmax=1)),
+    'qdiff': ('diff_heatmap_snaps', 'qdiffs.gif', 'qdiff', 'Q_hit - Q_stand {side} {title}', dict(cmap='RdBu_r', vmin=-2, vmax=2)),
+}
+
+def plot_heatmap(grid, player_range, dealer_range, title, cmap='RdBu_r', vmin=None, vmax=None, mask=None, ax=None, annot=False):
+    """
+    Plots the heatmap for a given grid.
+    """
+    if ax is None:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=(8, 6))
+    # rows correspond to player totals, highest player total at top
+    grid_plot = np.flipud(grid)  # flip so 21 is on top
+    y_labels = list(reversed(player_range))
+    x_labels = dealer_range
+    sns.heatmap(grid_plot, xticklabels=x_labels, yticklabels=y_labels, cmap=cmap, vmin=vmin, vmax=vmax, mask=mask, ax=ax, annot=annot, fmt='.2f', cbar_kws={'label': title})
+    ax.set_xlabel('Dealer upcard')
+    ax.set_ylabel('Player total')
+    ax.set_title(title)
+    return ax
+
+def render_snapshot(grids, kind, title, dpi=200):
+    """
+    Renders the hard/soft snapshot of one checkpoint to an image, without pyplot or a display
+    (the figure is drawn straight onto an Agg canvas). Kept at module level so worker processes can run it.
+
+    Args:
+        grids: grids of one checkpoint (see q_to_grids).
+        kind: 'policy' or 'qdiff' (see SNAP_KINDS).
+        title: title suffix, e.g. 'Episode 2500'.
+        dpi: resolution of the image.
+    Returns: RGB image as a uint8 array of shape (height, width, 3).
+    """
+    _, _, key, title_format, settings = SNAP_KINDS[kind]
+    fig = Figure(figsize=(6, 8), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax_h, ax_s = fig.subplots(2, 1)
+    pr = grids['player_range']
+    dr = grids['dealer_range']
+    plot_heatmap(grids[f'{key}_hard'], pr, dr, title_format.format(side='Hard', title=title), mask=~grids['covered_hard'], ax=ax_h, **settings)
+    plot_heatmap(grids[f'{key}_soft'], pr, dr, title_format.format(side='Soft', title=title), mask=~grids['covered_soft'], ax=ax_s, **settings)
+    fig.tight_layout()
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba())[..., :3].copy()
+
+def evolution_grid_size(n, ncols=3):
+    """
+    Returns: figure size (width, height) in inches of the evolution grid for n checkpoints.
+    """
+    nrows = int(np.ceil(n / ncols))
+    return (4*ncols, 3*nrows*2)
+
+def draw_evolution_grid(fig, stack, episodes, ncols=3):
+    """
+    Draws the hard/soft policy of every checkpoint into one grid on the given figure.
+
+    Args:
+        fig: matplotlib figure to draw on (from pyplot or a headless Figure).
+        stack: stacked grids of all checkpoints (see q_to_grid_stack).
+        episodes: episode number of each checkpoint.
+        ncols: number of checkpoints per row.
+    """
+    n = len(episodes)
+    nrows = int(np.ceil(n / ncols))
+    axes = np.asarray(fig.subplots(nrows*2, ncols)).reshape(nrows*2, ncols)
+    pr = stack['player_range']
+    dr = stack['dealer_range']
+    for idx, epi in enumerate(episodes):
+        row = (idx // ncols) * 2 # floor times 2
+        col = idx % ncols
+        title = f'Episode {epi}'
+        # policy for hard
+        plot_heatmap(stack['pref_hard'][idx], pr, dr, f'Hard Policy {title}', mask=~stack['covered_hard'][idx], ax=axes[row, col], cmap='coolwarm', vmin=0, vmax=1)
+        # policy for soft
+        plot_heatmap(stack['pref_soft'][idx], pr, dr, f'Soft Policy {title}', mask=~stack['covered_soft'][idx], ax=axes[row+1, col], cmap='coolwarm', vmin=0, vmax=1)
+    fig.tight_layout()
+
+def save_evolution_grid(stack, episodes, path, ncols=3, dpi=200):
+    """
+    Renders the evolution grid headless (Agg canvas, no pyplot) and saves it. Kept at module level so worker processes can run it.
+    """
+    fig = Figure(figsize=evolution_grid_size(len(episodes), ncols))
+    FigureCanvasAgg(fig)
+    draw_evolution_grid(fig, stack, episodes, ncols)
+    fig.savefig(path, dpi=dpi)
+
+def _render_job(job):
+    return render_snapshot(*job)
+
+def _snapshot_jobs(stack, episodes, kind, dpi):
+    for idx, epi in enumerate(episodes):
+        grids = {key: value if key.endswith('range') else value[idx] for key, value in stack.items()}
+        yield (grids, kind, f'Episode {epi}', dpi)
+
+def render_snapshots(stack, episodes, kind, pool=None, dpi=200):
+    """
+    Renders the snapshot of every checkpoint, fanning the figures out across a process pool.
+
+    Args:
+        stack: stacked grids of all checkpoints (see q_to_grid_stack).
+        episodes: episode number of each checkpoint.
+        kind: 'policy' or 'qdiff' (see SNAP_KINDS).
+        pool: optional ProcessPoolExecutor to render in (None renders in this process).
+        dpi: resolution of the images.
+    Returns: iterator over (episode, RGB image array), in checkpoint order, as they finish rendering.
+    """
+    jobs = _snapshot_jobs(stack, episodes, kind, dpi)
+    images = map(_render_job, jobs) if pool is None else pool.map(_render_job, jobs)
+    return zip(episodes, images)
+
+def write_gif(frames, output_filename, duration=500, loop=0):
+    """
+    Saves frames as a GIF. Each frame is converted to a palette image as soon as it arrives, so only the
+    small palette frames (not the RGB images) are kept, but all of them are held in memory until the GIF is
+    written at the end (Pillow's GIF writer needs every frame before it writes the file).
+
+    Args:
+        frames: iterable of PIL images or RGB arrays.
+        output_filename: Name of the output GIF file.
+        duration: Duration between frames in milliseconds.
+        loop: Number of loops for the GIF (0 means infinite).
+    Returns: number of frames written.
+    """
+    def palette_frames():
+        for frame in frames:
+            image = frame if isinstance(frame, Image.Image) else Image.fromarray(frame)
+            yield image.convert('RGB').quantize()
+
+    quantized = palette_frames()
+    first = next(quantized, None)
+    if first is None:
+        return 0
+    rest = list(quantized)
+    first.save(output_filename, save_all=True, append_images=rest, duration=duration, loop=loop)
+    return 1 + len(rest)
+
+def render_evolution(stack, episodes, output_dir='.', workers=None, save_snaps=True, make_gifs=True, grid_path=None,
+                     ncols=3, dpi=200, duration=500):
+    """
+    Renders the per-checkpoint policy and Q-diff snapshots in parallel and passes them straight to
+    evolution.gif and qdiffs.gif (and, if save_snaps, PNG snapshots) without re-reading any PNGs.
+    Everything is drawn on headless Agg canvases, so no display is needed.
+
+    Args:
+        stack: stacked grids of all checkpoints (see q_to_grid_stack).
+        episodes: episode number of each checkpoint.
+        output_dir: directory for the snapshot folders and GIFs.
+        workers: number of worker processes (None uses all cores, 1 renders in this process).
+        save_snaps: whether to also save each snapshot as a PNG.
+        make_gifs: whether to write the GIFs.
+        grid_path: optional path to also save the evolution grid of all checkpoints to (rendered alongside the snapshots).
+        ncols: number of checkpoints per row of the grid.
+        dpi: resolution of the images.
+        duration: Duration between GIF frames in milliseconds.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    try:
+        grid_job = None
+        if grid_path:
+            # the grid is the largest figure, so start it first
+            if pool is None:
+                save_evolution_grid(stack, episodes, grid_path, ncols, dpi)
+            else:
+                grid_job = pool.submit(save_evolution_grid, stack, episodes, grid_path, ncols, dpi)
+
+        for kind, (snap_dir, gif_name, _, _, _) in SNAP_KINDS.items():
+            if not (save_snaps or make_gifs):
+                break
+            if save_snaps:
+                os.makedirs(os.path.join(output_dir, snap_dir), exist_ok=True)
+
+            def frames():
+                for epi, image in render_snapshots(stack, episodes, kind, pool, dpi):
+                    if save_snaps:
+                        Image.fromarray(image).save(os.path.join(output_dir, snap_dir, f"episode_{int(epi):04d}_hard_soft.png"))
+                    yield image
+
+            if make_gifs:
+                write_gif(frames(), os.path.join(output_dir, gif_name), duration=duration)
+            else:
+                for _ in frames():
+                    pass
+
+        if grid_job is not None:
+            grid_job.result()
+    finally:
+        if pool is not None:
+            pool.shutdown()
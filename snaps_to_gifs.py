@@ -1,10 +1,13 @@
 from PIL import Image
 import glob
 import os
+from blackjack_rl.visualization import render
 
 def create_gif_from_pngs(output_filename, png_dir, duration=100, loop=0):
     """
     Save the images as a GIF.
+    The PNGs are opened one at a time as the GIF is encoded (see render.write_gif).
+    To build the GIFs straight from a training run without PNGs, use render.render_evolution.
     
     args:
       output_filename: Name of the output GIF file.
@@ -19,18 +22,14 @@ def create_gif_from_pngs(output_filename, png_dir, duration=100, loop=0):
         print("No PNG files found in the specified directory.")
         return
 
-    # Open the first image and append the rest
-    images = [Image.open(file) for file in files]
-    
-    images[0].save(
-        output_filename,
-        save_all=True,
-        append_images=images[1:],
-        duration=duration,
-        loop=loop
-    )
+    def frames():
+        for file in files:
+            with Image.open(file) as image:
+                yield image.convert('RGB')
+
+    render.write_gif(frames(), output_filename, duration=duration, loop=loop)
     print(f"GIF successfully created: {output_filename}")
 
 if __name__ == "__main__":
     create_gif_from_pngs("evolution.gif", "evolution_snaps", duration=500,loop=0)
-    create_gif_from_pngs("qdiffs.gif", "diff_heatmap_snaps", duration=500,loop=0)
\ No newline at end of file
+    create_gif_from_pngs("qdiffs.gif", "diff_heatmap_snaps", duration=500,loop=0)